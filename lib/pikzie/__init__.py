@@ -17,6 +17,8 @@ version = "1.0.5"
 
 from pikzie.tester import Tester
 from pikzie.core import *
+from pikzie.parallel import *
+from pikzie.backoff import *
 from pikzie.decorators import *
 from pikzie.module_base import *
 from pikzie.utils import *
@@ -15,20 +15,437 @@
 
 import os
 import sys
+import stat
 import re
 import traceback
 import random
 try:
     import syslog
-    import fcntl
 except ImportError:
     pass
-import select
 import time
-import signal
+import mmap
+import threading
+import hashlib
+import heapq
+import itertools
+import collections
+import concurrent.futures
 
 import pikzie.core
 import pikzie.pretty_print as pp
+from pikzie.pattern_cache import PatternCache
+from pikzie.log_watcher import LogWatcher
+from pikzie.process import CommandRunner, SpawnedProcess
+from pikzie.backoff import Backoff
+
+def _compile_pattern(pattern):
+    return PatternCache.default().compile(pattern)
+
+_byte_formats = ("b", "c")
+
+def _is_bytes_like(object):
+    """
+    Returns True if object is a sequence of unsigned bytes.
+    memoryviews of other formats such as "b" and "d" aren't because
+    their elements aren't equal when their bytes are equal and vice
+    versa.
+    """
+    if isinstance(object, memoryview):
+        return object.format == "B" and object.ndim == 1
+    return isinstance(object, (bytes, bytearray))
+
+def _is_comparable_as_bytes(expected, actual):
+    """
+    Returns True if expected and actual are equal if and only if
+    their bytes are equal. It is also True for memoryviews of the
+    same byte format such as "b" on both sides.
+    """
+    if _is_bytes_like(expected) and _is_bytes_like(actual):
+        return True
+    if not (isinstance(expected, memoryview) and
+            isinstance(actual, memoryview)):
+        return False
+    return (expected.format == actual.format and
+            expected.format in _byte_formats and
+            expected.ndim == 1 and actual.ndim == 1)
+
+def _byte_view(object):
+    view = memoryview(object)
+    if view.format == "B" and view.ndim == 1:
+        return view
+    if view.c_contiguous:
+        return view.cast("B")
+    return memoryview(view.tobytes())
+
+def _find_first_difference(view1, view2, chunk_size=64 * 1024):
+    """
+    Returns the offset of the first different byte in view1 and
+    view2, or None if they are the same. Views are compared per
+    chunk without copying and the different chunk is bisected.
+    """
+    size = min(len(view1), len(view2))
+    offset = 0
+    while offset < size:
+        end = min(offset + chunk_size, size)
+        if view1[offset:end] != view2[offset:end]:
+            while end - offset > 1:
+                middle = (offset + end) // 2
+                if view1[offset:middle] == view2[offset:middle]:
+                    offset = middle
+                else:
+                    end = middle
+            return offset
+        offset = end
+    if len(view1) == len(view2):
+        return None
+    return size
+
+_file_chunk_size = 1024 * 1024
+
+def _find_first_file_difference(file1, file2, size):
+    """
+    Returns the offset of the first different byte in file1 and
+    file2 that have the same size, or None if they are the same.
+    Files are mapped into memory if possible and read per chunk
+    otherwise.
+    """
+    if size == 0:
+        return None
+    try:
+        map1 = mmap.mmap(file1.fileno(), 0, access=mmap.ACCESS_READ)
+    except (mmap.error, ValueError, OSError):
+        map1 = None
+    try:
+        map2 = mmap.mmap(file2.fileno(), 0, access=mmap.ACCESS_READ)
+    except (mmap.error, ValueError, OSError):
+        map2 = None
+    try:
+        if map1 is not None and map2 is not None:
+            with memoryview(map1) as view1:
+                with memoryview(map2) as view2:
+                    return _find_first_difference(view1, view2,
+                                                  _file_chunk_size)
+    finally:
+        if map1 is not None:
+            map1.close()
+        if map2 is not None:
+            map2.close()
+
+    chunk1 = bytearray(_file_chunk_size)
+    chunk2 = bytearray(_file_chunk_size)
+    offset = 0
+    while True:
+        size1 = file1.readinto(chunk1)
+        size2 = file2.readinto(chunk2)
+        view1 = memoryview(chunk1)[:size1]
+        view2 = memoryview(chunk2)[:size2]
+        difference = _find_first_difference(view1, view2)
+        if difference is not None:
+            return offset + difference
+        if size1 == 0:
+            return None
+        offset += size1
+
+def _count_lines(file, offset):
+    file.seek(0)
+    n_lines = 0
+    while offset > 0:
+        chunk = file.read(min(offset, _file_chunk_size))
+        if not chunk:
+            break
+        n_lines += chunk.count(b"\n")
+        offset -= len(chunk)
+    return n_lines
+
+def _read_window(file, offset, size):
+    file.seek(offset)
+    return memoryview(file.read(size))
+
+def _file_digest(path, algorithm):
+    digest = hashlib.new(algorithm)
+    chunk = bytearray(_file_chunk_size)
+    view = memoryview(chunk)
+    file = open(path, "rb")
+    try:
+        while True:
+            size = file.readinto(chunk)
+            if not size:
+                break
+            digest.update(view[:size])
+    finally:
+        file.close()
+    return digest.hexdigest()
+
+_search_overlap = 64 * 1024
+_snippet_width = 80
+
+def _snippet(buffer, start, end, newline):
+    """
+    Returns the part of the line in buffer that has the match at
+    buffer[start:end]. At most _snippet_width items before and after
+    the match are included and long matches are cut.
+    """
+    end = min(end, start + _snippet_width)
+    snippet_start = max(0, start - _snippet_width)
+    line_start = buffer.rfind(newline, snippet_start, start)
+    if line_start != -1:
+        snippet_start = line_start + 1
+    snippet_end = min(len(buffer), end + _snippet_width)
+    line_end = buffer.find(newline, end, snippet_end)
+    if line_end != -1:
+        snippet_end = line_end
+    return buffer[snippet_start:snippet_end]
+
+def _search_chunks(pattern, read, newline, chunk_size, overlap):
+    """
+    Returns (line, snippet) of the first match of pattern in the
+    content returned by read() per chunk, or None if it isn't found.
+
+    The last overlap items of a chunk are searched again with the
+    next chunk. So matches up to overlap items aren't missed at chunk
+    boundaries. One more item is kept before them so that "^" and
+    look-behind assertions work.
+    """
+    buffer = read(chunk_size)
+    start = 0
+    n_lines = 0
+    while True:
+        chunk = read(chunk_size)
+        match = pattern.search(buffer, start)
+        if chunk:
+            limit = max(start, len(buffer) - overlap)
+            if match and match.start() >= limit:
+                match = None
+        if match:
+            line = n_lines + buffer.count(newline, 0, match.start()) + 1
+            return line, _snippet(buffer, match.start(), match.end(), newline)
+        if not chunk:
+            return None
+        keep = max(limit - 1, 0)
+        n_lines += buffer.count(newline, 0, keep)
+        buffer = buffer[keep:] + chunk
+        start = limit - keep
+
+def _search_file(pattern, path, encoding):
+    """
+    Returns (line, snippet) of the first match of pattern in the
+    file at path, or None if it isn't found. Bytes patterns are
+    searched in the file mapped into memory. Text patterns are
+    searched in the file decoded per chunk by encoding.
+    """
+    pattern = _compile_pattern(pattern)
+    if not isinstance(pattern.pattern, bytes):
+        file = open(path, encoding=encoding, errors="replace", newline="")
+        try:
+            return _search_chunks(pattern, file.read, "\n",
+                                  _file_chunk_size, _search_overlap)
+        finally:
+            file.close()
+
+    file = open(path, "rb")
+    try:
+        try:
+            content = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (mmap.error, ValueError, OSError):
+            return _search_chunks(pattern, file.read, b"\n",
+                                  _file_chunk_size, _search_overlap)
+        try:
+            match = pattern.search(content)
+            if match is None:
+                return None
+            start, end = match.span()
+            del match
+            line = _count_lines(file, start) + 1
+            return line, _snippet(content, start, end, b"\n")
+        finally:
+            content.close()
+    finally:
+        file.close()
+
+def _scan_tree(directory):
+    """
+    Returns a dictionary that maps relative paths of entries under
+    directory to their stat results. Symbolic links aren't followed.
+    """
+    entries = {}
+    directories = [""]
+    while directories:
+        relative_directory = directories.pop()
+        current_directory = directory
+        if relative_directory:
+            current_directory = os.path.join(directory, relative_directory)
+        for entry in os.scandir(current_directory):
+            path = os.path.join(relative_directory, entry.name)
+            entries[path] = entry.stat(follow_symlinks=False)
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(path)
+    return entries
+
+def _flatten_numbers(numbers):
+    if isinstance(numbers, memoryview):
+        if numbers.ndim > 1:
+            numbers = numbers.cast("B").cast(numbers.format)
+        return numbers.tolist()
+    return numbers
+
+def _number_shape(numbers):
+    """
+    Returns the shape of numbers. Sequences that don't have shape
+    such as lists are one dimensional.
+    """
+    shape = getattr(numbers, "shape", None)
+    if shape is None:
+        return (len(numbers),)
+    return tuple(shape)
+
+def _number_size(shape):
+    size = 1
+    for length in shape:
+        size *= length
+    return size
+
+def _difference_key(difference):
+    if difference != difference:
+        return float("inf")
+    return difference
+
+def _find_out_of_delta(expected, actual, delta, max_offenders):
+    """
+    Returns the number of items of actual that aren't in delta of
+    the corresponding items of expected and the worst offenders as a
+    list of (index, expected, actual, difference). NumPy is used if
+    it's already imported because importing it is slow.
+    """
+    numpy = sys.modules.get("numpy")
+    if numpy is not None:
+        return _find_out_of_delta_numpy(numpy, expected, actual, delta,
+                                        max_offenders)
+    n_offenders = 0
+    # A min-heap of the worst offenders. -index is used so that an
+    # earlier offender is kept when differences are the same.
+    worst = []
+    for i, (expected_item, actual_item) in enumerate(zip(
+            _flatten_numbers(expected), _flatten_numbers(actual))):
+        difference = abs(actual_item - expected_item)
+        if difference <= delta:
+            continue
+        n_offenders += 1
+        if max_offenders <= 0:
+            continue
+        entry = (_difference_key(difference), -i,
+                 (i, expected_item, actual_item, difference))
+        if len(worst) < max_offenders:
+            heapq.heappush(worst, entry)
+        elif entry > worst[0]:
+            heapq.heapreplace(worst, entry)
+    worst.sort(reverse=True)
+    return n_offenders, [entry[2] for entry in worst]
+
+def _find_out_of_delta_numpy(numpy, expected, actual, delta, max_offenders):
+    expected = numpy.asarray(expected, dtype=numpy.float64).ravel()
+    actual = numpy.asarray(actual, dtype=numpy.float64).ravel()
+    differences = numpy.abs(actual - expected)
+    indexes = numpy.flatnonzero(~(differences <= delta))
+    if len(indexes) == 0:
+        return 0, []
+    keys = numpy.nan_to_num(differences[indexes], nan=numpy.inf)
+    n_offenders = min(max_offenders, len(indexes))
+    if n_offenders < len(indexes):
+        worst = numpy.argpartition(-keys, n_offenders - 1)[:n_offenders]
+    else:
+        worst = numpy.arange(len(indexes))
+    worst = worst[numpy.argsort(-keys[worst], kind="stable")]
+    offenders = []
+    for i in indexes[worst]:
+        offenders.append((int(i), expected[i].item(), actual[i].item(),
+                          differences[i].item()))
+    return len(indexes), offenders
+
+def _find_unsatisfied(predicate, items):
+    return [i for i, item in enumerate(items) if not predicate(item)]
+
+class _UnsatisfiedItems(object):
+    """
+    Iterates (index, item) of each item of iterable that doesn't
+    satisfy predicate in order. Items are read per chunk so that
+    iterable is consumed lazily. If executor is given, chunks are
+    evaluated by it and a limited number of chunks are submitted at
+    once. n_items is the number of read items.
+    """
+    max_pending_chunks = 16
+
+    def __init__(self, predicate, iterable, chunk_size, executor):
+        self.predicate = predicate
+        self.iterable = iterable
+        self.chunk_size = chunk_size
+        self.executor = executor
+        self.n_items = 0
+
+    def __iter__(self):
+        iterator = iter(self.iterable)
+        pending_chunks = collections.deque()
+        if self.executor:
+            max_pending_chunks = self.max_pending_chunks
+        else:
+            max_pending_chunks = 1
+        while True:
+            while len(pending_chunks) < max_pending_chunks:
+                chunk = list(itertools.islice(iterator, self.chunk_size))
+                if not chunk:
+                    break
+                if self.executor:
+                    result = self.executor.submit(_find_unsatisfied,
+                                                  self.predicate, chunk)
+                else:
+                    result = _find_unsatisfied(self.predicate, chunk)
+                pending_chunks.append((self.n_items, chunk, result))
+                self.n_items += len(chunk)
+            if not pending_chunks:
+                break
+            offset, chunk, result = pending_chunks.popleft()
+            if self.executor:
+                result = result.result()
+            for i in result:
+                yield offset + i, chunk[i]
+
+_kernel_symbols_cache = {}
+_kernel_symbols_lock = threading.Lock()
+
+def _load_kernel_symbols(path, reload=False):
+    """
+    Returns a dictionary that maps kernel symbol names in path such
+    as /proc/kallsyms to their addresses. The dictionary is cached
+    per path until the file is changed or reload is true.
+    """
+    path_stat = os.stat(path)
+    signature = (path_stat.st_dev, path_stat.st_ino,
+                 path_stat.st_size, path_stat.st_mtime)
+    with _kernel_symbols_lock:
+        cached = _kernel_symbols_cache.get(path)
+    if cached is not None and cached[0] == signature and not reload:
+        return cached[1]
+    symbols = {}
+    file = open(path)
+    try:
+        for line in file:
+            symbol_info = line.split()
+            if len(symbol_info) < 3:
+                continue
+            symbols.setdefault(symbol_info[2], symbol_info[0])
+    finally:
+        file.close()
+    with _kernel_symbols_lock:
+        _kernel_symbols_cache[path] = (signature, symbols)
+    return symbols
+
+def _format_capped_paths(label, paths, max_paths):
+    lines = ["%s: <%d>" % (label, len(paths))]
+    for path in paths[:max_paths]:
+        lines.append("  %s" % path)
+    if len(paths) > max_paths:
+        lines.append("  ... %d more" % (len(paths) - max_paths))
+    return lines
 
 class Assertions(object):
     def fail(self, message):
@@ -120,13 +537,45 @@ class Assertions(object):
         Passes if expected == actual.
 
           self.assert_equal(5, 2 + 3) # => pass
+
+        If expected and actual are containers or objects of the same
+        class, differences between them are reported with their
+        paths such as "[3]['items'][1042].price: 10 != 11".
+
+        If expected and actual are bytes-like objects, they are
+        compared by assert_equal_bytes().
         """
-        if expected == actual:
+        if _is_comparable_as_bytes(expected, actual):
+            self.assert_equal_bytes(expected, actual, message)
+        elif expected == actual:
             self._pass_assertion()
         else:
-            formatted_expected = pp.format(expected)
-            formatted_actual = pp.format(actual)
-            self._fail("", message, formatted_expected, formatted_actual)
+            self._fail("", message,
+                       pp.LazyFormat(expected), pp.LazyFormat(actual),
+                       pp.structural_diff(expected, actual))
+
+    def assert_equal_bytes(self, expected, actual, message=None):
+        """
+        Passes if bytes-like objects expected and actual have the
+        same bytes. They are compared without copying and a hexdump
+        around the first different byte is shown on failure.
+
+          self.assert_equal_bytes(b"abc", bytearray(b"abc")) # => pass
+        """
+        expected_view = _byte_view(expected)
+        actual_view = _byte_view(actual)
+        offset = _find_first_difference(expected_view, actual_view)
+        if offset is None:
+            self._pass_assertion()
+        else:
+            system_message = "expected: <%d bytes>\n" \
+                " but was: <%d bytes>\n" \
+                "first difference at offset %d (0x%x)\n" \
+                "\n" \
+                "hexdump diff:\n%s" % \
+                (len(expected_view), len(actual_view), offset, offset,
+                 pp.format_hexdump_diff(expected_view, actual_view, offset))
+            self._fail(system_message, message)
 
     def assert_not_equal(self, not_expected, actual, message=None):
         """
@@ -165,6 +614,86 @@ class Assertions(object):
                 (expected, delta, range, actual)
             self._fail(system_message, message)
 
+    def assert_all_in_delta(self, expected, actual, delta, message=None,
+                            max_offenders=5):
+        """
+        Passes if each item of actual is in delta of the
+        corresponding item of expected. expected and actual are
+        sequences of numbers such as lists, array.array, memoryview
+        and NumPy's ndarray. It's counted as one assertion.
+
+          self.assert_all_in_delta([1, 2], [1.01, 1.99], 0.1) # => pass
+          self.assert_all_in_delta([1, 2], [1.01, 2.2], 0.1)  # => fail
+        """
+        expected_shape = _number_shape(expected)
+        actual_shape = _number_shape(actual)
+        n_items = _number_size(expected_shape)
+        if len(expected_shape) > 1 and len(actual_shape) > 1:
+            if expected_shape != actual_shape:
+                system_message = \
+                    "expected: <%s> shape\n but was: <%s> shape" % \
+                    (expected_shape, actual_shape)
+                self._fail(system_message, message)
+        elif n_items != _number_size(actual_shape):
+            system_message = "expected: <%d> items\n but was: <%d> items" % \
+                (n_items, _number_size(actual_shape))
+            self._fail(system_message, message)
+        n_out_of_delta, offenders = _find_out_of_delta(expected, actual,
+                                                       delta, max_offenders)
+        if n_out_of_delta == 0:
+            self._pass_assertion()
+            return
+        lines = ["expected: all of <%d> items are in delta <%s>" % \
+                     (n_items, pp.format(delta)),
+                 " but was: <%d> items are out of delta" % n_out_of_delta,
+                 "worst offenders:"]
+        for index, expected_item, actual_item, difference in offenders:
+            lines.append("  [%d]: <%s> != <%s> (difference: <%s>)" % \
+                             (index,
+                              pp.format(expected_item),
+                              pp.format(actual_item),
+                              pp.format(difference)))
+        self._fail("\n".join(lines), message)
+
+    def assert_all(self, predicate, iterable, message=None, max_samples=10,
+                   chunk_size=1000, executor=None):
+        """
+        Passes if predicate(item) returns a true value for all items
+        of iterable. It's counted as one assertion. iterable is
+        consumed lazily per chunk_size items. If executor such as
+        concurrent.futures.ThreadPoolExecutor is given, chunks are
+        evaluated by it. The number of failed items and the first
+        max_samples failed items are reported.
+
+          self.assert_all(lambda x: x > 0, [1, 2, 3])  # => pass
+          self.assert_all(lambda x: x > 0, [1, -2, 3]) # => fail
+        """
+        unsatisfied_items = _UnsatisfiedItems(predicate, iterable,
+                                              chunk_size, executor)
+        n_failed_items = 0
+        samples = []
+        for index, item in unsatisfied_items:
+            n_failed_items += 1
+            if len(samples) < max_samples:
+                samples.append((index, item))
+        if n_failed_items == 0:
+            self._pass_assertion()
+            return
+        try:
+            formatted_predicate = pp.format_callable_object(predicate)
+        except AttributeError:
+            formatted_predicate = pp.format(predicate)
+        lines = ["expected: <%s> returns a true value for all items" % \
+                     formatted_predicate,
+                 " but was: <%d> of <%d> items failed" % \
+                     (n_failed_items, unsatisfied_items.n_items),
+                 "failed items:"]
+        for index, item in samples:
+            lines.append("  [%d]: <%s>" % (index, pp.format(item)))
+        if n_failed_items > len(samples):
+            lines.append("  ...")
+        self._fail("\n".join(lines), message)
+
     def assert_match(self, pattern, target, message=None):
         """
         Passes if re.match(pattern, target) doesn't return None.
@@ -172,7 +701,7 @@ class Assertions(object):
           self.assert_match("abc", "abcde") # => pass
           self.assert_match("abc", "deabc") # => fail
         """
-        if re.match(pattern, target):
+        if _compile_pattern(pattern).match(target):
             self._pass_assertion()
         else:
             pattern_repr = pp.format_re_repr(pattern)
@@ -192,7 +721,7 @@ class Assertions(object):
           self.assert_not_match("abc", "deabc") # => pass
           self.assert_not_match("abc", "abcde") # => fail
         """
-        if re.match(pattern, target) is None:
+        if _compile_pattern(pattern).match(target) is None:
             self._pass_assertion()
         else:
             pattern_repr = pp.format_re_repr(pattern)
@@ -212,7 +741,7 @@ class Assertions(object):
         self.assert_search("abc", "deabc") # => pass
         self.assert_search("abc", "deABC") # => fail
         """
-        if re.search(pattern, target):
+        if _compile_pattern(pattern).search(target):
             self._pass_assertion()
         else:
             pattern_repr = pp.format_re_repr(pattern)
@@ -232,7 +761,7 @@ class Assertions(object):
           self.assert_search("abc", "deABC") # => pass
           self.assert_search("abc", "deabc") # => fail
         """
-        if re.search(pattern, target) is None:
+        if _compile_pattern(pattern).search(target) is None:
             self._pass_assertion()
         else:
             pattern_repr = pp.format_re_repr(pattern)
@@ -398,24 +927,23 @@ class Assertions(object):
                     "Use assert_nothing_raised_call() instead.")
         return self.assert_nothing_raised_call(*args, **kw_args)
 
-    def assert_run_command(self, command, **kw_args):
+    def assert_run_command(self, command, timeout=None, **kw_args):
         """
         Passes if command is successfully ran and returns subprocess.Popen.
+        Output of command is captured while it's running and
+        available as process.stdout and process.stderr. If command
+        isn't finished in timeout seconds, its process group is
+        killed and it fails.
 
           process = self.assert_run_command(["echo", "123"])    # => pass
           self.assert_equal("123\\n", process.stdout.read())    # => pass
           self.assert_run_command("false")                      # => fail
           self.assert_run_command("unknown-command")            # => fail
+          self.assert_run_command(["sleep", "10"], timeout=1)   # => fail
         """
-        import subprocess
-        popen_kw_args = {
-            "stdin": subprocess.PIPE,
-            "stdout": subprocess.PIPE,
-            "stderr": subprocess.PIPE,
-        }
-        popen_kw_args.update(kw_args)
+        runner = CommandRunner(command, timeout, **kw_args)
         try:
-            process = subprocess.Popen(command, **popen_kw_args)
+            runner.start()
         except OSError:
             exception_class, exception_value = sys.exc_info()[:2]
             message = "expected: <%s> is successfully ran\n" \
@@ -424,14 +952,158 @@ class Assertions(object):
                  pp.format_exception_class(exception_class),
                  str(exception_value))
             self._fail(message)
-        return_code = process.wait()
+        return_code = runner.wait()
+        if runner.timed_out:
+            message = "expected: <%s> is finished in <%s> seconds\n" \
+                " but was: killed by timeout" % \
+                (pp.format(command), timeout)
+            self._fail(message)
         if return_code != 0:
             message = "expected: <%s> is successfully finished\n" \
                 " but was: <%d> is returned as exit code" % \
                 (pp.format(command), return_code)
             self._fail(message)
+        self._notify_truncated_outputs(runner)
+        self._pass_assertion()
+        return runner.process
+
+    def _notify_truncated_outputs(self, runner):
+        if runner.truncated_outputs:
+            self.notify("output of <%s> is truncated because it's kept "
+                        "open after the command exits: <%s>" % \
+                            (pp.format(runner.command),
+                             ", ".join(runner.truncated_outputs)))
+
+    def assert_run_commands(self, commands, max_parallel=None, timeout=None,
+                            message=None, **kw_args):
+        """
+        Passes if all commands are successfully ran and returns a
+        list of subprocess.Popen. Commands are ran concurrently in
+        at most max_parallel threads and all failed commands are
+        reported. See assert_run_command() for timeout and kw_args.
+
+          self.assert_run_commands([["make", "-C", "a"],
+                                    ["make", "-C", "b"]],
+                                   max_parallel=2)             # => pass
+          self.assert_run_commands(["true", "false"])          # => fail
+        """
+        def run(command):
+            runner = CommandRunner(command, timeout, **kw_args)
+            try:
+                runner.run()
+            except OSError:
+                exception_class, exception_value = sys.exc_info()[:2]
+                return runner, \
+                    "<%s>(%s) is raised and failed to ran" % \
+                    (pp.format_exception_class(exception_class),
+                     str(exception_value))
+            if runner.timed_out:
+                return runner, "killed by timeout after <%s> seconds" % timeout
+            if runner.process.returncode != 0:
+                return runner, "<%d> is returned as exit code" % \
+                    runner.process.returncode
+            return runner, None
+
+        commands = list(commands)
+        executor = concurrent.futures.ThreadPoolExecutor(max_parallel)
+        try:
+            results = list(executor.map(run, commands))
+        finally:
+            executor.shutdown(True)
+        failures = ["  <%s>: %s" % (pp.format(runner.command), failure)
+                    for runner, failure in results if failure]
+        if failures:
+            lines = ["expected: all of <%d> commands are successfully "
+                     "finished" % len(commands),
+                     " but was: <%d> commands failed" % len(failures)]
+            lines.extend(failures)
+            self._fail("\n".join(lines), message)
+        for runner, failure in results:
+            self._notify_truncated_outputs(runner)
+        self._pass_assertion()
+        return [runner.process for runner, failure in results]
+
+    def assert_spawn_command(self, command, pattern, timeout=None,
+                             **kw_args):
+        """
+        Passes if command is successfully ran and pattern is found
+        in its stdout or stderr in timeout seconds. It returns the
+        running command as SpawnedProcess for further interaction.
+        It should be closed by the caller. Output is searched
+        incrementally while it's written. So a server can be used as
+        soon as it reports that it's ready.
+
+          with self.assert_spawn_command(["my-server"],
+                                         "(?m)^Ready", 5) as server: # => pass
+              server.send("status\\n")
+              server.expect("(?m)^OK")
+          self.assert_spawn_command(["false"], "(?m)^Ready")         # => fail
+        """
+        spawned = SpawnedProcess(command, **kw_args)
+        try:
+            spawned.start()
+        except OSError:
+            exception_class, exception_value = sys.exc_info()[:2]
+            message = "expected: <%s> is successfully ran\n" \
+                " but was: <%s>(%s) is raised and failed to ran" % \
+                (pp.format(command),
+                 pp.format_exception_class(exception_class),
+                 str(exception_value))
+            self._fail(message)
+        if timeout is None:
+            timeout = spawned.timeout
+        if spawned.expect(pattern, timeout):
+            self._pass_assertion()
+            return spawned
+        closed = spawned.is_eof()
+        return_code = spawned.close()
+        if closed:
+            but_was = "output is closed with <%d> exit code" % return_code
+        else:
+            but_was = "not found until timeout"
+        message = "expected: <%s> is found in output of <%s> " \
+            "in <%s> seconds\n" \
+            " but was: %s\n" \
+            "  output: <%s>" % \
+            (pp.format_re(pattern), pp.format(command), timeout,
+             but_was, pp.format(spawned.content))
+        self._fail(message)
+
+    def assert_search_log_call(self, pattern, path,
+                               callable_object, *args, **kw_args):
+        """
+        Passes if re.search(pattern, LOG_CONTENT) doesn't return None
+        after callable_object(*args, **kw_args). LOG_CONTENT is
+        lines appended to the log file at path while and after
+        callable_object is called. It waits for appended lines for
+        LogWatcher.timeout seconds.
+
+          self.assert_search_log_call("X", "/tmp/server.log",
+                                      request, "XYZ") # => pass
+          self.assert_search_log_call("X", "/tmp/server.log",
+                                      request, "ABC") # => fail
+        """
+        self.assert_callable(callable_object)
+        watcher = LogWatcher(path)
+        watcher.start()
+        try:
+            result = callable_object(*args, **kw_args)
+            self._search_log(watcher, pattern)
+        finally:
+            watcher.close()
         self._pass_assertion()
-        return process
+        return result
+
+    def _search_log(self, watcher, pattern):
+        if watcher.search(pattern):
+            return
+        message = \
+            "expected: <%s> is found in <%s>\n" \
+            " content: <%s>" % \
+            (pp.format_re(pattern),
+             pp.format(watcher.path),
+             pp.format(watcher.content))
+        self.fail(message)
 
     def assert_search_syslog_call(self, pattern,
                                   callable_object, *args, **kw_args):
@@ -447,50 +1119,16 @@ class Assertions(object):
 
         self.assert_callable(callable_object)
 
-        mark = 'Pikzie: %.20f' % random.random()
-        syslog.syslog(mark)
-
-        log_file = "/var/log/messages"
-        command = ["tail", "-F", log_file]
-        try:
-            from subprocess import Popen, PIPE
-            messages = Popen(command, stdout=PIPE, close_fds=True)
-        except ImportError:
-            from popen2 import Popen3
-            messages = Popen3(command)
-            messages.stdout = messages.fromchild
-
-        fcntl.fcntl(messages.stdout, fcntl.F_SETFL,
-                    os.O_NONBLOCK | fcntl.fcntl(messages.stdout, fcntl.F_GETFL))
-
-        def search(pattern):
-            if isinstance(pattern, str):
-                pattern = re.compile(pattern)
-            content = b''
-            timeout = 1.5
-            while len(select.select([messages.stdout], [], [], timeout)[0]) > 0:
-                timeout = 0.1
-                added_content = messages.stdout.read()
-                if not added_content:
-                    break
-                content += added_content
-                if re.search(pattern, str(content)):
-                    return
-            message = \
-                "expected: <%s> is found in <%s>\n" \
-                " content: <%s>" % \
-                (pp.format_re(pattern),
-                 pp.format(log_file),
-                 pp.format(content))
-            self.fail(message)
-
+        watcher = LogWatcher("/var/log/messages")
+        watcher.start()
         try:
-            search(re.escape(mark))
-            result = callable_object(*args, **kw_args)
-            search(pattern)
+            mark = 'Pikzie: %.20f' % random.random()
+            syslog.syslog(mark)
+            self._search_log(watcher, re.escape(mark))
+            callable_object(*args, **kw_args)
+            self._search_log(watcher, pattern)
         finally:
-            os.kill(messages.pid, signal.SIGINT)
-            messages.wait()
+            watcher.close()
 
     def assert_exists(self, path):
         """
@@ -516,27 +1154,233 @@ class Assertions(object):
         else:
             self._pass_assertion()
 
-    def assert_open_file(self, name, *args):
+    def assert_file_equal(self, expected_path, actual_path, message=None):
         """
-        Passes if open(name, *args) succeeds.
+        Passes if files at expected_path and actual_path have the
+        same content. Files aren't read into memory at once. If
+        their sizes are different, it fails without reading them.
 
-          file = self.assert_open_file("/tmp/exist", "w") # => pass
-          self.assert_open_file("/tmp/nonexistence")      # => fail
+          self.assert_file_equal("expected.log", "/tmp/actual.log")
         """
         try:
-            result = open(name, *args)
+            expected_file = open(expected_path, "rb")
         except IOError:
+            self._fail_to_open(expected_path, ("rb",))
+        try:
+            try:
+                actual_file = open(actual_path, "rb")
+            except IOError:
+                self._fail_to_open(actual_path, ("rb",))
+            try:
+                expected_size = os.fstat(expected_file.fileno()).st_size
+                actual_size = os.fstat(actual_file.fileno()).st_size
+                if expected_size != actual_size:
+                    system_message = \
+                        "expected: <%s> and <%s> have the same content\n" \
+                        " but was: they have different sizes: <%d> != <%d>" % \
+                        (expected_path, actual_path, expected_size, actual_size)
+                    self._fail(system_message, message)
+                offset = _find_first_file_difference(expected_file,
+                                                     actual_file,
+                                                     expected_size)
+                if offset is None:
+                    self._pass_assertion()
+                    return
+                line = _count_lines(expected_file, offset) + 1
+                width = 16
+                context_rows = pp.hexdump_context_rows
+                base = max(0, offset - offset % width - context_rows * width)
+                window_size = (context_rows * 2 + 1) * width
+                expected_window = _read_window(expected_file, base, window_size)
+                actual_window = _read_window(actual_file, base, window_size)
+            finally:
+                actual_file.close()
+        finally:
+            expected_file.close()
+        system_message = \
+            "expected: <%s> and <%s> have the same content\n" \
+            " but was: first difference at offset %d (0x%x), line %d\n" \
+            "\n" \
+            "hexdump diff:\n%s" % \
+            (expected_path, actual_path, offset, offset, line,
+             pp.format_hexdump_diff(expected_window, actual_window,
+                                    offset - base, width, context_rows,
+                                    base))
+        self._fail(system_message, message)
+
+    def assert_file_match_digest(self, expected_digest, path,
+                                 algorithm="sha256", message=None):
+        """
+        Passes if hex digest of the content of the file at path by
+        algorithm is expected_digest. algorithm is a name accepted
+        by hashlib.new().
+
+          self.assert_file_match_digest("e3b0c442...", "/tmp/empty")
+        """
+        actual_digest = _file_digest(path, algorithm)
+        if actual_digest == expected_digest.lower():
+            self._pass_assertion()
+        else:
+            system_message = \
+                "expected: <%s> is %s digest of <%s>\n" \
+                " but was: <%s>" % \
+                (expected_digest, algorithm, path, actual_digest)
+            self._fail(system_message, message)
+
+    def assert_tree_equal(self, expected_dir, actual_dir, shallow=False,
+                          n_threads=None, max_paths=10, message=None):
+        """
+        Passes if directories expected_dir and actual_dir have the
+        same files with the same contents.
+
+        Symbolic links aren't followed. They are changed when their
+        targets are different. Files that have different types or
+        sizes are changed files. If shallow
+        is true, files that have the same size and modification time
+        are the same files like filecmp.cmp(). Contents of the
+        remaining files are compared by their digests that are
+        computed in n_threads threads. Up to max_paths missing, extra
+        and changed files are reported.
+
+          self.assert_tree_equal("test/fixtures/output", "/tmp/output")
+        """
+        expected_entries = self._scan_tree(expected_dir)
+        actual_entries = self._scan_tree(actual_dir)
+        missing_paths = sorted([path for path in expected_entries
+                                if path not in actual_entries])
+        extra_paths = sorted([path for path in actual_entries
+                              if path not in expected_entries])
+        changed_paths = []
+        candidate_paths = []
+        for path, expected_stat in expected_entries.items():
+            actual_stat = actual_entries.get(path)
+            if actual_stat is None:
+                continue
+            file_type = stat.S_IFMT(expected_stat.st_mode)
+            if file_type != stat.S_IFMT(actual_stat.st_mode):
+                changed_paths.append(path)
+            elif stat.S_ISLNK(file_type):
+                if os.readlink(os.path.join(expected_dir, path)) != \
+                        os.readlink(os.path.join(actual_dir, path)):
+                    changed_paths.append(path)
+            elif not stat.S_ISREG(file_type):
+                continue
+            elif expected_stat.st_size != actual_stat.st_size:
+                changed_paths.append(path)
+            elif shallow and \
+                    expected_stat.st_mtime == actual_stat.st_mtime:
+                continue
+            else:
+                candidate_paths.append(path)
+
+        def compare(path):
+            return _file_digest(os.path.join(expected_dir, path), "sha1") != \
+                _file_digest(os.path.join(actual_dir, path), "sha1")
+        executor = concurrent.futures.ThreadPoolExecutor(n_threads)
+        try:
+            for path, changed in zip(candidate_paths,
+                                     executor.map(compare, candidate_paths)):
+                if changed:
+                    changed_paths.append(path)
+        finally:
+            executor.shutdown(True)
+        changed_paths.sort()
+
+        if not (missing_paths or extra_paths or changed_paths):
+            self._pass_assertion()
+            return
+        lines = ["expected: <%s> and <%s> have the same files" % \
+                     (expected_dir, actual_dir),
+                 " but was:"]
+        lines.extend(_format_capped_paths("missing", missing_paths,
+                                          max_paths))
+        lines.extend(_format_capped_paths("extra", extra_paths, max_paths))
+        lines.extend(_format_capped_paths("changed", changed_paths,
+                                          max_paths))
+        self._fail("\n".join(lines), message)
+
+    def _scan_tree(self, directory):
+        try:
+            return _scan_tree(directory)
+        except OSError:
             exception_class, exception_value = sys.exc_info()[:2]
             message = \
-                "expected: open(%s) succeeds\n" \
+                "expected: <%s> is a readable directory\n" \
                 " but was: <%s>(%s) is raised" % \
-                (pp.format_call_arguments((name,) + args, {}),
+                (directory,
                  pp.format_exception_class(exception_class),
                  str(exception_value))
             self._fail(message)
+
+    def assert_search_file(self, pattern, path, encoding="utf-8",
+                           message=None):
+        """
+        Passes if pattern is found in the content of the file at
+        path. The file isn't read into memory at once. Bytes patterns
+        are searched in the raw content and text patterns are
+        searched in the content decoded by encoding. Matches in a
+        text file that are longer than 64KiB may not be found.
+
+          self.assert_search_file(b"^ERROR", "/tmp/server.log")
+                                      # => pass
+                                      # returns (line number, snippet)
+          self.assert_search_file("^\\d+ tests", "/tmp/output.log")
+        """
+        found = _search_file(pattern, path, encoding)
+        if found:
+            self._pass_assertion()
+            return found
+        else:
+            system_message = \
+                "expected: <%s> is found in <%s>\n" \
+                " but was: not found in <%d> bytes" % \
+                (pp.format_re(pattern), path, os.path.getsize(path))
+            self._fail(system_message, message)
+
+    def assert_not_found_file(self, pattern, path, encoding="utf-8",
+                              message=None):
+        """
+        Passes if pattern isn't found in the content of the file at
+        path. See assert_search_file() for how the file is searched.
+
+          self.assert_not_found_file(b"Traceback", "/tmp/server.log")
+        """
+        found = _search_file(pattern, path, encoding)
+        if found is None:
+            self._pass_assertion()
+        else:
+            line, snippet = found
+            system_message = \
+                "expected: <%s> isn't found in <%s>\n" \
+                " but was: found at line <%d>\n" \
+                " snippet: <%s>" % \
+                (pp.format_re(pattern), path, line, pp.format(snippet))
+            self._fail(system_message, message)
+
+    def assert_open_file(self, name, *args):
+        """
+        Passes if open(name, *args) succeeds.
+
+          file = self.assert_open_file("/tmp/exist", "w") # => pass
+          self.assert_open_file("/tmp/nonexistence")      # => fail
+        """
+        try:
+            result = open(name, *args)
+        except IOError:
+            self._fail_to_open(name, args)
         self._pass_assertion()
         return result
 
+    def _fail_to_open(self, name, args):
+        exception_class, exception_value = sys.exc_info()[:2]
+        message = \
+            "expected: open(%s) succeeds\n" \
+            " but was: <%s>(%s) is raised" % \
+            (pp.format_call_arguments((name,) + args, {}),
+             pp.format_exception_class(exception_class),
+             str(exception_value))
+        self._fail(message)
+
     def assert_try_call(self, timeout, interval,
                         callable_object, *args, **kw_args):
         """
@@ -544,6 +1388,14 @@ class Assertions(object):
         assertions in <timeout> seconds.
         (It will tried <timeout / interval> times.)
 
+        interval may be a pikzie.Backoff to increase intervals
+        exponentially and to try again as soon as something is
+        changed.
+
+        The number of tries and the seconds to the last try of each
+        call are appended to try_call_statistics of the test as a
+        tuple. They are also shown in verbose output.
+
           def random_number():
               number = random.randint(0, 9)
               self.assert_in_delta(5, number, 1)
@@ -551,54 +1403,101 @@ class Assertions(object):
           self.assert_try_call(1, 0.1, random_number) # => will pass
                                                       # returns 4, 5 or 6
           self.assert_try_call(1, 0.1, self.fail, "Never succeed") # => fail
+          self.assert_try_call(10, pikzie.Backoff(wake_up=[event]),
+                               random_number)         # => will pass
         """
-        rest = timeout
+        if isinstance(interval, Backoff):
+            backoff = interval
+        else:
+            backoff = Backoff(interval, 1, interval, 0)
+        backoff.start()
         while True:
-            before = time.time()
             try:
                 result = callable_object(*args, **kw_args)
+                backoff.attempt()
                 break
             except pikzie.core.AssertionFailure:
-                if rest <= 0:
+                elapsed = backoff.attempt()
+                if elapsed >= timeout:
+                    self.try_call_statistics.append((backoff.n_attempts,
+                                                     elapsed))
+                    if backoff is interval:
+                        interval_message = "interval: <%r>\n" % backoff
+                    else:
+                        interval_message = "interval: <%s> seconds\n" % \
+                            interval
                     message = \
                         "expected: %s succeeds\n" \
                         " timeout: <%s> seconds\n" \
-                        "interval: <%s> seconds\n" \
+                        "%s" \
+                        "attempts: <%d> in <%.3f> seconds\n" \
                         " but was:\n%s" % \
                         (pp.format_call(callable_object, args, kw_args),
-                         timeout, interval,
+                         timeout, interval_message,
+                         backoff.n_attempts, elapsed,
                          str(sys.exc_info()[1]))
                     self._fail(message)
-                runtime = time.time() - before
-                wait_time = interval - runtime
-                if wait_time > 0:
-                    time.sleep(wait_time)
-                rest -= max(runtime, interval)
+                wait_time = backoff.interval(backoff.n_attempts - 1)
+                backoff.wait(min(wait_time, timeout - elapsed))
+        self.try_call_statistics.append((backoff.n_attempts, backoff.elapsed))
         self._pass_assertion()
         return result
 
-    def assert_kernel_symbol(self, name):
+    def assert_kernel_symbol(self, name, path=None):
         """
         Passes if /proc/kallsyms can be opened and name is in the list.
+        Kernel symbols are parsed only once and cached. path can be
+        used instead of /proc/kallsyms.
 
           self.assert_kernel_symbol("printk")       # => pass
                                                     # returns an address of printk
           self.assert_kernel_symbol("non_existent") # => fail
         """
-        if not hasattr(os, "uname"):
-            self.omit("only for Linux environment")
-        if os.uname()[0] != "Linux":
-            self.omit("only for Linux environment")
-
-        for line in self.assert_open_file("/proc/kallsyms"):
-            symbol_info = line.split()
-            address = symbol_info[0]
-            symbol_name = symbol_info[2]
-            if name == symbol_name:
-                self._pass_assertion()
-                return address
+        symbols = self._kernel_symbols([name], path)
+        if name in symbols:
+            self._pass_assertion()
+            return symbols[name]
         self._fail("expected: <%r> is in kernel symbols" % name)
 
+    def assert_kernel_symbols(self, names, path=None, message=None):
+        """
+        Passes if all names are in /proc/kallsyms. All missing names
+        are reported. See assert_kernel_symbol() for path.
+
+          self.assert_kernel_symbols(["printk", "kmalloc"]) # => pass
+                                                           # returns addresses
+          self.assert_kernel_symbols(["printk", "xxx"])     # => fail
+        """
+        names = list(names)
+        symbols = self._kernel_symbols(names, path)
+        missing_names = [name for name in names if name not in symbols]
+        if missing_names:
+            system_message = \
+                "expected: <%s> are in kernel symbols\n" \
+                " missing: <%s>" % \
+                (pp.format(names), pp.format(missing_names))
+            self._fail(system_message, message)
+        self._pass_assertion()
+        return [symbols[name] for name in names]
+
+    def _kernel_symbols(self, names, path):
+        if path is None:
+            if not hasattr(os, "uname"):
+                self.omit("only for Linux environment")
+            if os.uname()[0] != "Linux":
+                self.omit("only for Linux environment")
+            path = "/proc/kallsyms"
+
+        try:
+            symbols = _load_kernel_symbols(path)
+            for name in names:
+                if name not in symbols:
+                    # Symbols may be added by loading a kernel module.
+                    return _load_kernel_symbols(path, True)
+            return symbols
+        except (IOError, OSError):
+            self._fail_to_open(path, ())
+
 
 class AssertRaiseContext(object):
     """A context manager for exception-related testing"""
@@ -0,0 +1,160 @@
+# Copyright (C) 2026  Kouhei Sutou <kou@clear-code.com>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import random
+import select
+
+__all__ = ["Backoff"]
+
+class Backoff(object):
+    """
+    Intervals between tries of assert_try_call().
+
+    The n-th interval (from 0) is initial * factor ** n seconds but
+    it's capped by max_interval. Each interval is randomly changed
+    by up to jitter times of it so that many waiters don't try at
+    the same time.
+
+    Waiting is finished immediately when one of wake_up sources is
+    changed. A source is one of the followings:
+
+      * A threading.Event. Waiting is finished when it's set after
+        it's found unset since start(). It isn't changed by waiting.
+        So the caller should clear it to be woken up again.
+      * A file descriptor or an object that has fileno(). Waiting is
+        finished while it's readable but not sooner than
+        min_fd_interval seconds after waiting is started. The caller
+        should drain it after waking up. Otherwise each wait is
+        finished after min_fd_interval seconds.
+      * A path. Waiting is finished when the file at the path is
+        created, changed or removed. It's checked every
+        poll_interval seconds.
+
+    n_attempts and elapsed have the number of tries and the seconds
+    to the last try of the last assert_try_call() that uses it.
+
+      backoff = pikzie.Backoff(0.01, max_interval=0.5,
+                               wake_up=[server.ready_event])
+      self.assert_try_call(10, backoff, self.assert_connectable)
+    """
+
+    poll_interval = 0.01
+    min_fd_interval = 0.01
+
+    def __init__(self, initial=0.01, factor=2, max_interval=1, jitter=0.1,
+                 wake_up=()):
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self._events = []
+        self._fds = []
+        self._paths = []
+        for source in wake_up:
+            if isinstance(source, str):
+                self._paths.append(source)
+            elif hasattr(source, "is_set"):
+                self._events.append(source)
+            else:
+                self._fds.append(source)
+        self._event_states = {}
+        self._file_signatures = {}
+        self.n_attempts = 0
+        self.elapsed = 0
+        self._start_time = None
+
+    def __repr__(self):
+        return "Backoff(initial=%r, factor=%r, max_interval=%r, jitter=%r)" % \
+            (self.initial, self.factor, self.max_interval, self.jitter)
+
+    def start(self):
+        self.n_attempts = 0
+        self.elapsed = 0
+        self._start_time = time.time()
+        for event in self._events:
+            self._event_states[event] = event.is_set()
+        for path in self._paths:
+            self._file_signatures[path] = self._file_signature(path)
+
+    def attempt(self):
+        """
+        Records a try and returns seconds since start().
+        """
+        self.n_attempts += 1
+        self.elapsed = time.time() - self._start_time
+        return self.elapsed
+
+    def interval(self, n):
+        interval = min(self.initial * self.factor ** n, self.max_interval)
+        if self.jitter:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0, min(interval, self.max_interval))
+
+    def wait(self, seconds):
+        """
+        Waits for seconds or a change of the wake up sources. Returns
+        True if it's woken up by a change.
+        """
+        now = time.time()
+        deadline = now + seconds
+        # A readable fd that isn't drained must not finish waiting
+        # immediately forever.
+        fd_start_time = now + self.min_fd_interval
+        while True:
+            check_fds = now >= fd_start_time
+            if self._is_woken_up(check_fds):
+                return True
+            rest = deadline - now
+            if rest <= 0:
+                return False
+            if self._paths or self._fds or len(self._events) > 1:
+                rest = min(rest, self.poll_interval)
+            if self._fds and check_fds:
+                select.select(self._fds, [], [], rest)
+            elif self._events and not self._events[0].is_set():
+                self._events[0].wait(rest)
+            else:
+                # A set event isn't cleared. So it's polled until
+                # it's unset and set again.
+                if self._events:
+                    rest = min(rest, self.poll_interval)
+                time.sleep(rest)
+            now = time.time()
+
+    def _is_woken_up(self, check_fds):
+        woken_up = False
+        for event in self._events:
+            is_set = event.is_set()
+            if is_set and not self._event_states.get(event):
+                woken_up = True
+            self._event_states[event] = is_set
+        if check_fds and self._fds and \
+                select.select(self._fds, [], [], 0)[0]:
+            woken_up = True
+        for path in self._paths:
+            signature = self._file_signature(path)
+            if signature != self._file_signatures.get(path):
+                self._file_signatures[path] = signature
+                woken_up = True
+        return woken_up
+
+    def _file_signature(self, path):
+        try:
+            path_stat = os.stat(path)
+        except OSError:
+            return None
+        return (path_stat.st_ino, path_stat.st_size, path_stat.st_mtime)
@@ -15,22 +15,42 @@
 
 import re
 import sys
-import traceback
+import linecache
 import os
-import errno
 import fnmatch
 import types
 import time
-import tempfile
+import threading
+import inspect
+import asyncio
+import contextvars
+import concurrent.futures
 
 from pikzie.color import *
 from pikzie.results import *
 from pikzie.assertions import Assertions
 from pikzie.decorators import metadata
 from pikzie.priority import PriorityChecker
+from pikzie.result_store import ResultStore
+from pikzie.pattern_cache import PatternCache
 
 __all__ = ["TestSuite", "TestCase", "TestRunnerContext", "TestLoader"]
 
+if hasattr(sys, "_getframe"):
+    def _caller_frame(depth):
+        "Returns the frame that is depth levels above the caller."
+        return sys._getframe(depth + 1)
+else:
+    def _caller_frame(depth):
+        "Returns the frame that is depth levels above the caller."
+        try:
+            raise ZeroDivisionError
+        except ZeroDivisionError:
+            frame = sys.exc_info()[2].tb_frame
+        for i in range(depth + 1):
+            frame = frame.f_back
+        return frame
+
 class TestSuite(object):
     """
     A test suite is a composite test consisting of a number of TestCases.
@@ -66,12 +86,31 @@ class TestSuite(object):
                 break
         context.on_finish_test_suite(self)
 
+    async def run_async(self, context, semaphore):
+        context.on_start_test_suite(self)
+        await asyncio.gather(*[test.run_async(context, semaphore)
+                               for test in self._tests])
+        context.on_finish_test_suite(self)
+
 class TracebackEntry(object):
-    def __init__(self, file_name, line_number, name, content):
+    """
+    An entry of a traceback.
+
+    If content isn't given, the source line is read by linecache
+    when content is referred at the first time.
+    """
+    def __init__(self, file_name, line_number, name, content=None):
         self.file_name = file_name
         self.line_number = line_number
         self.name = name
-        self.content = content
+        self._content = content
+
+    def content(self):
+        if self._content is None:
+            line = linecache.getline(self.file_name, self.line_number)
+            self._content = line.strip()
+        return self._content
+    content = property(content)
 
     def __str__(self):
         result = '%s:%d: %s()' % (self.file_name, self.line_number, self.name)
@@ -80,11 +119,13 @@ class TracebackEntry(object):
         return result
 
 class AssertionFailure(Exception):
-    def __init__(self, message, user_message=None, expected=None, actual=None):
+    def __init__(self, message, user_message=None, expected=None, actual=None,
+                 differences=None):
         self.message = message
         self.user_message = user_message
         self.expected = expected
         self.actual = actual
+        self.differences = differences
 
     def __str__(self):
         result = self.message
@@ -106,6 +147,83 @@ class OmissionTestError(Exception):
     def __str__(self):
         return self.message
 
+_event_loops = threading.local()
+
+def event_loop():
+    """
+    Returns the event loop that is shared by tests in the current
+    thread. Async tests are ran on it.
+    """
+    loop = getattr(_event_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _event_loops.loop = loop
+    return loop
+
+def run_until_complete(awaitable):
+    """
+    Runs awaitable on event_loop() and returns its result. If an event
+    loop is already running in the current thread (e.g. a sync test
+    that is ran by AsyncTestSuite runs other tests), awaitable is ran
+    on a new event loop in another thread because event loops can't
+    be nested.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return event_loop().run_until_complete(awaitable)
+
+    def run():
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(awaitable)
+        finally:
+            loop.close()
+    context = contextvars.copy_context()
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        return executor.submit(context.run, run).result()
+
+def _run_steps(steps):
+    """
+    Runs steps, a generator that yields awaitables, to the end.
+    Yielded awaitables are ran by run_until_complete() and their
+    results or exceptions are sent back to steps.
+    """
+    result = None
+    exception = None
+    while True:
+        try:
+            if exception is None:
+                awaitable = steps.send(result)
+            else:
+                awaitable = steps.throw(exception)
+        except StopIteration:
+            return
+        try:
+            result = run_until_complete(awaitable)
+            exception = None
+        except BaseException as error:
+            result = None
+            exception = error
+
+async def _run_steps_async(steps):
+    result = None
+    exception = None
+    while True:
+        try:
+            if exception is None:
+                awaitable = steps.send(result)
+            else:
+                awaitable = steps.throw(exception)
+        except StopIteration:
+            return
+        try:
+            result = await awaitable
+            exception = None
+        except BaseException as error:
+            result = None
+            exception = error
+
 class TestCaseRunner(object):
     def __init__(self, test_case, tests, priority_mode=True):
         self.test_case = test_case
@@ -129,6 +247,28 @@ class TestCaseRunner(object):
             if context.need_interrupt():
                 break
         context.on_finish_test_case(self.test_case)
+        ResultStore.default().flush()
+
+    async def run_async(self, context, semaphore):
+        """
+        Runs tests concurrently on the running event loop. At most
+        the number of tests that are allowed by semaphore are ran at
+        once.
+        """
+        tests = self.tests()
+        if len(tests) == 0:
+            return
+
+        async def run_test(test):
+            async with semaphore:
+                if context.need_interrupt():
+                    return
+                await test.run_async(context)
+
+        context.on_start_test_case(self.test_case)
+        await asyncio.gather(*[run_test(test) for test in tests])
+        context.on_finish_test_case(self.test_case)
+        ResultStore.default().flush()
 
 class TestCaseTemplate(object):
     def setup(self):
@@ -201,6 +341,7 @@ class TestCase(TestCaseTemplate, Assertions):
         self.__description = self._test_method().__doc__
         self.__data_label = data_label
         self.__data = data
+        self.try_call_statistics = []
 
     def _data(self):
         return self.__data
@@ -271,13 +412,23 @@ class TestCase(TestCaseTemplate, Assertions):
             self._need_to_run_according_to_priority()
 
     def run(self, context):
+        _run_steps(self._run_steps(context))
+
+    async def run_async(self, context):
+        """
+        Runs the test as a coroutine. Async setup, test and teardown
+        are awaited on the running event loop.
+        """
+        await _run_steps_async(self._run_steps(context))
+
+    def _run_steps(self, context):
         success = False
         try:
             self._started(context)
 
             try:
                 try:
-                    self._run_setup(context)
+                    yield from self._await(self._run_setup(context))
                 except PendingTestError:
                     self._pend_test(context)
                 except OmissionTestError:
@@ -290,7 +441,7 @@ class TestCase(TestCaseTemplate, Assertions):
                     return
 
                 try:
-                    self._run_test(context)
+                    yield from self._await(self._run_test(context))
                     success = True
                 except AssertionFailure:
                     self._add_failure(context)
@@ -305,7 +456,7 @@ class TestCase(TestCaseTemplate, Assertions):
                     self._add_error(context)
             finally:
                 try:
-                    self._run_teardown(context)
+                    yield from self._await(self._run_teardown(context))
                 except PendingTestError:
                     self._pend_test(context)
                 except OmissionTestError:
@@ -319,18 +470,23 @@ class TestCase(TestCaseTemplate, Assertions):
         finally:
             self._finished(success, context)
 
+    def _await(self, result):
+        if inspect.isawaitable(result):
+            result = yield result
+        return result
+
     def _run_setup(self, context):
-        self.setup()
+        return self.setup()
 
     def _run_test(self, context):
         test_method = self._test_method()
         if self.__data_label:
-            test_method(self.__data)
+            return test_method(self.__data)
         else:
-            test_method()
+            return test_method()
 
     def _run_teardown(self, context):
-        self.teardown()
+        return self.teardown()
 
     def _method_name(self):
         return self.__method_name
@@ -339,10 +495,15 @@ class TestCase(TestCaseTemplate, Assertions):
         return getattr(self, self._method_name())
 
     def _pass_assertion(self):
-        self.__context.pass_assertion(self)
+        if self.__notify_each_assertion:
+            self.__context.pass_assertion(self)
+        else:
+            self.__n_assertions += 1
 
-    def _fail(self, message, user_message=None, expected=None, actual=None):
-        raise AssertionFailure(message, user_message, expected, actual)
+    def _fail(self, message, user_message=None, expected=None, actual=None,
+              differences=None):
+        raise AssertionFailure(message, user_message, expected, actual,
+                               differences)
 
     def _pend(self, message):
         raise PendingTestError(message)
@@ -351,28 +512,41 @@ class TestCase(TestCaseTemplate, Assertions):
         raise OmissionTestError(message)
 
     def _notify(self, message):
-        try:
-            raise ZeroDivisionError
-        except ZeroDivisionError:
-            frame = sys.exc_info()[2].tb_frame.f_back.f_back
+        frame = self._skip_relevant_frames(_caller_frame(2))
+        if self.__context.deduplicate_notifications:
+            key = (frame.f_code, frame.f_lineno, str(message))
+            notification = self.__notifications.get(key)
+            if notification:
+                notification.n_occurrences += 1
+                return
         traceback = self._prepare_frame(frame, True)
         notification = Notification(self, message, traceback)
+        if self.__context.deduplicate_notifications:
+            self.__notifications[key] = notification
         self.__context.add_notification(self, notification)
 
     def _started(self, context):
         self.__context = context
+        self.__notify_each_assertion = context.notify_each_assertion
+        self.__n_assertions = 0
+        self.__notifications = {}
+        self.try_call_statistics = []
         context.on_start_test(self)
-        if os.path.exists(self._passed_file()):
-            os.remove(self._passed_file())
 
     def _finished(self, success, context):
+        if self.__n_assertions > 0:
+            context.pass_assertions(self, self.__n_assertions)
+            self.__n_assertions = 0
         if success:
             self._add_success(context)
+        else:
+            self._set_previous_test_success(False)
         context.on_finish_test(self)
         self.__context = None
+        self.__notifications = None
 
     def _add_success(self, context):
-        open(self._passed_file(), "w").close()
+        self._set_previous_test_success(True)
         context.add_success(self)
 
     def _add_failure(self, context):
@@ -380,7 +554,8 @@ class TestCase(TestCaseTemplate, Assertions):
         traceback = self._prepare_traceback(traceback, True)
         failure = Failure(self, str(assertion_failure), traceback,
                           assertion_failure.expected,
-                          assertion_failure.actual)
+                          assertion_failure.actual,
+                          assertion_failure.differences)
         context.add_failure(self, failure)
 
     def _add_error(self, context):
@@ -407,32 +582,55 @@ class TestCase(TestCaseTemplate, Assertions):
         length = None
         if tb and compute_length:
             length = self._count_relevant_frame_levels(tb.tb_frame)
-        stack_infos = traceback.extract_tb(tb, length)
-        return self._create_traceback_entries(stack_infos)
+        entries = []
+        while tb and (length is None or len(entries) < length):
+            entries.append(self._create_traceback_entry(tb.tb_frame,
+                                                        tb.tb_lineno))
+            tb = tb.tb_next
+        return entries
 
-    def _prepare_frame(self, frame, compute_length):
+    def _skip_relevant_frames(self, frame):
         while frame and self._is_relevant_frame_level(frame):
             frame = frame.f_back
+        return frame
+
+    def _prepare_frame(self, frame, compute_length):
+        frame = self._skip_relevant_frames(frame)
         length = None
         if compute_length:
             length = self._count_relevant_frame_levels(frame)
-        stack_infos = traceback.extract_stack(frame, length)
-        return self._create_traceback_entries(stack_infos)
-
-    def _create_traceback_entries(self, stack_infos):
         entries = []
-        for stack_info in stack_infos:
-            filename, lineno, name, line = stack_info
-            entries.append(TracebackEntry(filename, lineno, name, line))
+        while frame and (length is None or len(entries) < length):
+            entries.append(self._create_traceback_entry(frame, frame.f_lineno))
+            frame = frame.f_back
+        entries.reverse()
         return entries
 
+    def _create_traceback_entry(self, frame, line_number):
+        code = frame.f_code
+        linecache.lazycache(code.co_filename, frame.f_globals)
+        return TracebackEntry(code.co_filename, line_number, code.co_name)
+
+    _relevant_frame_levels = {}
+    _event_loop_module_names = ("asyncio", "concurrent")
     def _is_relevant_frame_level(self, frame):
+        code = frame.f_code
+        try:
+            return self._relevant_frame_levels[code]
+        except KeyError:
+            pass
+        relevant = False
         globals = frame.f_globals
         for cls in (TestCase,) + TestCase.__bases__:
             name = cls.__name__
             if name in globals and globals[name] == cls:
-                return True
-        return False
+                relevant = True
+                break
+        module_name = globals.get("__name__", "").split(".")[0]
+        if module_name in self._event_loop_module_names:
+            relevant = True
+        self._relevant_frame_levels[code] = relevant
+        return relevant
 
     def _count_relevant_frame_levels(self, frame):
         length = 0
@@ -442,34 +640,16 @@ class TestCase(TestCaseTemplate, Assertions):
         return length
 
     def _is_previous_test_success(self):
-        return os.path.exists(self._passed_file())
-
-    def _passed_file(self):
-        return os.path.join(self._result_dir(), "passed")
-
-    def _result_dir(self):
-        components = [".test-result", self._test_case_name(), self.short_name()]
-        parent_directories = [os.path.dirname(sys.argv[0]),
-                              os.getcwd(),
-                              os.path.join(os.path.dirname(__file__), "..")]
-        if hasattr(os, "getuid"):
-            parent_directories.append([os.path.join(tempfile.gettempdir(),
-                                                    str(os.getuid()))])
-        else:
-            parent_directories.append([os.path.join(tempfile.gettempdir(),
-                                                    str(os.getpid()))])
-        for parent_directory in parent_directories:
-            dir = os.path.abspath(os.path.join(parent_directory, *components))
-            if os.path.isdir(dir):
-                return dir
-            try:
-                os.makedirs(dir)
-                return dir
-            except OSError:
-                pass
+        return self._result_store().is_passed(self._test_case_name(),
+                                              self.short_name())
 
-        raise OSError(errno.EACCES, "Permission denied",
-                      ", ".join(parent_directories))
+    def _set_previous_test_success(self, success):
+        self._result_store().set_passed(self._test_case_name(),
+                                        self.short_name(),
+                                        success)
+
+    def _result_store(self):
+        return ResultStore.default()
 
     default_priority = "normal"
     def _need_to_run_according_to_priority(self):
@@ -623,14 +803,15 @@ class TestLoader(object):
         if names is None: return names
         if type(names) == str:
             names = [names]
-        re_re = re.compile("/(.*)/([ilmsux]*)")
+        pattern_cache = PatternCache.default()
+        re_re = pattern_cache.compile("/(.*)/([ilmsux]*)")
         def prepare(name):
             match = re_re.search(name)
             if match:
                 flags = 0
                 for flag_string in match.groups()[1]:
                     flags |= getattr(re, flag_string.upper())
-                name = re.compile(match.groups()[0], flags)
+                name = pattern_cache.compile(match.groups()[0], flags)
             return name
         return [prepare(name) for name in names]
 
@@ -646,121 +827,187 @@ class TestRunnerContext(object):
     contain tuples of (testcase, exceptioninfo), where exceptioninfo is the
     formatted traceback of the error that occurred.
     """
-    def __init__(self):
+    def __init__(self, deduplicate_notifications=False):
         self.n_assertions = 0
         self.n_tests = 0
+        self.deduplicate_notifications = deduplicate_notifications
         self.results = []
         self.listeners = []
+        self._callbacks = {}
         self.interrupted = False
         self.elapsed = 0
+        self._n_results = {}
+        self._faults = []
+        self._n_critical_faults = 0
+        self._start_times = {}
+        self._lock = threading.RLock()
+        pattern_cache = PatternCache.default()
+        self._n_pattern_cache_hits = -pattern_cache.n_hits
+        self._n_pattern_cache_misses = -pattern_cache.n_misses
+
+    def n_pattern_cache_hits(self):
+        "The number of hits of PatternCache.default() in this run"
+        return self._n_pattern_cache_hits + PatternCache.default().n_hits
+    n_pattern_cache_hits = property(n_pattern_cache_hits)
+
+    def n_pattern_cache_misses(self):
+        "The number of misses of PatternCache.default() in this run"
+        return self._n_pattern_cache_misses + PatternCache.default().n_misses
+    n_pattern_cache_misses = property(n_pattern_cache_misses)
+
+    def add_pattern_cache_statistics(self, n_hits, n_misses):
+        """
+        Adds hits and misses of a pattern cache in another process
+        such as a worker process.
+        """
+        with self._lock:
+            self._n_pattern_cache_hits += n_hits
+            self._n_pattern_cache_misses += n_misses
 
     def add_listener(self, listener):
-        self.listeners.append(listener)
+        with self._lock:
+            self.listeners.append(listener)
+            for callback_name in dir(listener):
+                if not callback_name.startswith("on_"):
+                    continue
+                callback = getattr(listener, callback_name)
+                if not callable(callback):
+                    continue
+                name = callback_name[len("on_"):]
+                self._callbacks.setdefault(name, []).append(callback)
 
     def add_listeners(self, listeners):
-        self.listeners.extend(listeners)
+        for listener in listeners:
+            self.add_listener(listener)
 
     def faults(self):
-        return list(filter(lambda result: result.fault, self.results))
+        return list(self._faults)
     faults = property(faults)
 
     def n_faults(self):
-        return len(self.faults)
+        return len(self._faults)
     n_faults = property(n_faults)
 
     def n_failures(self):
-        return len(list(filter(lambda result: isinstance(result, Failure),
-                               self.results)))
+        return self._n_results.get(Failure, 0)
     n_failures = property(n_failures)
 
     def n_errors(self):
-        return len(list(filter(lambda result: isinstance(result, Error),
-                               self.results)))
+        return self._n_results.get(Error, 0)
     n_errors = property(n_errors)
 
     def n_pendings(self):
-        return len(list(filter(lambda result: isinstance(result, Pending),
-                               self.results)))
+        return self._n_results.get(Pending, 0)
     n_pendings = property(n_pendings)
 
     def n_omissions(self):
-        return len(list(filter(lambda result: isinstance(result, Omission),
-                               self.results)))
+        return self._n_results.get(Omission, 0)
     n_omissions = property(n_omissions)
 
     def n_notifications(self):
-        return len(list(filter(lambda result: isinstance(result, Notification),
-                               self.results)))
+        return self._n_results.get(Notification, 0)
     n_notifications = property(n_notifications)
 
+    def notify_each_assertion(self):
+        """
+        Whether tests should report each passed assertion by
+        pass_assertion(). It's true only when a listener has
+        on_pass_assertion callback. Otherwise, tests count passed
+        assertions by themselves and report the number by
+        pass_assertions() at once.
+        """
+        return "pass_assertion" in self._callbacks
+    notify_each_assertion = property(notify_each_assertion)
+
     def pass_assertion(self, test):
-        self.n_assertions += 1
-        self._notify("pass_assertion", test)
+        with self._lock:
+            self.n_assertions += 1
+            self._notify("pass_assertion", test)
+
+    def pass_assertions(self, test, n_assertions):
+        with self._lock:
+            self.n_assertions += n_assertions
+            if self.notify_each_assertion:
+                for i in range(n_assertions):
+                    self._notify("pass_assertion", test)
 
     def on_start_test(self, test):
         "Called when the given test is about to be run"
-        self._start_at = time.time()
-        self.n_tests += 1
-        self._notify("start_test", test)
+        with self._lock:
+            self._start_times[test] = time.time()
+            self.n_tests += 1
+            self._notify("start_test", test)
 
     def on_finish_test(self, test):
         "Called when the given test has been run"
-        self._finish_at = time.time()
-        self.elapsed += (self._finish_at - self._start_at)
-        self._notify("finish_test", test)
+        with self._lock:
+            self.elapsed += self._elapsed(test)
+            del self._start_times[test]
+            self._notify("finish_test", test)
 
     def on_start_test_case(self, test_case):
         "Called when the given test case is about to be run"
-        self._notify("start_test_case", test_case)
+        with self._lock:
+            self._notify("start_test_case", test_case)
 
     def on_finish_test_case(self, test_case):
         "Called when the given test case has been run"
-        self._notify("finish_test_case", test_case)
+        with self._lock:
+            self._notify("finish_test_case", test_case)
 
     def on_start_test_suite(self, test_suite):
         "Called when the given test suite is about to be run"
-        self._notify("start_test_suite", test_suite)
+        with self._lock:
+            self._notify("start_test_suite", test_suite)
 
     def on_finish_test_suite(self, test_suite):
         "Called when the given test suite has been run"
-        self._notify("finish_test_suite", test_suite)
+        with self._lock:
+            self._notify("finish_test_suite", test_suite)
 
     def add_error(self, test, error):
         """Called when an error has occurred."""
-        error.elapsed = time.time() - self._start_at
-        self.results.append(error)
-        self._notify("error", error)
+        self._add_result(test, error)
 
     def add_failure(self, test, failure):
         """Called when a failure has occurred."""
-        failure.elapsed = time.time() - self._start_at
-        self.results.append(failure)
-        self._notify("failure", failure)
+        self._add_result(test, failure)
 
     def add_notification(self, test, notification):
         """Called when a notification has occurred."""
-        notification.elapsed = time.time() - self._start_at
-        self.results.append(notification)
-        self._notify("notification", notification)
+        self._add_result(test, notification)
 
     def add_success(self, test):
         "Called when a test has completed successfully"
-        success = Success(test)
-        success.elapsed = time.time() - self._start_at
-        self.results.append(success)
-        self._notify("success", success)
+        self._add_result(test, Success(test))
 
     def pend_test(self, test, pending):
         """Called when a test is pended."""
-        pending.elapsed = time.time() - self._start_at
-        self.results.append(pending)
-        self._notify("pending", pending)
+        self._add_result(test, pending)
 
     def omit_test(self, test, omission):
         """Called when a test is omitted."""
-        omission.elapsed = time.time() - self._start_at
-        self.results.append(omission)
-        self._notify("omission", omission)
+        self._add_result(test, omission)
+
+    def _elapsed(self, test):
+        return time.time() - self._start_times[test]
+
+    def _add_result(self, test, result):
+        with self._lock:
+            result.elapsed = self._elapsed(test)
+            self._record_result(result)
+
+    def _record_result(self, result):
+        with self._lock:
+            self.results.append(result)
+            for result_class in type(result).__mro__:
+                self._n_results[result_class] = \
+                    self._n_results.get(result_class, 0) + 1
+            if result.fault:
+                self._faults.append(result)
+                if result.critical:
+                    self._n_critical_faults += 1
+            self._notify(result.name, result)
 
     def interrupt(self):
         "Indicates that the tests should be interrupted"
@@ -770,14 +1017,15 @@ class TestRunnerContext(object):
         return self.interrupted
 
     def succeeded(self):
-        return len(list(filter(lambda fault: fault.critical, self.faults))) == 0
+        return self._n_critical_faults == 0
     succeeded = property(succeeded)
 
     def _notify(self, name, *args):
-        for listener in self.listeners:
-            callback_name = "on_%s" % name
-            if hasattr(listener, callback_name):
-                getattr(listener, callback_name)(self, *args)
+        callbacks = self._callbacks.get(name)
+        if not callbacks:
+            return
+        for callback in callbacks:
+            callback(self, *args)
 
     def summary(self):
         return ("%d test(s), %d assertion(s), %d failure(s), %d error(s), " \
@@ -0,0 +1,196 @@
+# Copyright (C) 2026  Kouhei Sutou <kou@clear-code.com>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import codecs
+
+from pikzie.pattern_cache import PatternCache
+
+class LogWatcher(object):
+    """
+    Watches lines appended to a log file like "tail -F".
+
+    Only the content appended after start() is read. The file is
+    polled by its size and reopened when it's rotated or truncated.
+    The read content is kept in a sliding window that has at most
+    window_size characters (or bytes if encoding is None). Appended
+    content is read and searched per chunk_size bytes before the
+    window is slid. So every appended line is searched and searching
+    costs only the size of the window and the chunk.
+
+      watcher = LogWatcher("/var/log/messages")
+      watcher.start()
+      try:
+          syslog.syslog("XYZ")
+          watcher.search("X")   # => match object
+          watcher.search("X")   # => None after timeout
+      finally:
+          watcher.close()
+    """
+
+    window_size = 64 * 1024
+    chunk_size = 64 * 1024
+    timeout = 1.5
+    interval = 0.05
+
+    def __init__(self, path, encoding="utf-8", window_size=None,
+                 timeout=None, interval=None):
+        self.path = path
+        self.encoding = encoding
+        if window_size is not None:
+            self.window_size = window_size
+        if timeout is not None:
+            self.timeout = timeout
+        if interval is not None:
+            self.interval = interval
+        if encoding is None:
+            self._newline = b"\n"
+            self._window = b""
+        else:
+            self._newline = "\n"
+            self._window = ""
+        self._file = None
+        self._offset = 0
+        self._decoder = None
+
+    def content(self):
+        """
+        Returns the content in the window that isn't consumed by
+        search() yet.
+        """
+        return self._window
+    content = property(content)
+
+    def start(self):
+        """
+        Starts watching. The current content of the file is skipped.
+        """
+        self._open()
+        if self._file is not None:
+            self._offset = os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def _open(self):
+        self.close()
+        self._offset = 0
+        if self.encoding is not None:
+            decoder_class = codecs.getincrementaldecoder(self.encoding)
+            self._decoder = decoder_class(errors="replace")
+        try:
+            self._file = open(self.path, "rb")
+        except (IOError, OSError):
+            self._file = None
+
+    def _is_rotated(self):
+        if self._file is None:
+            return os.path.exists(self.path)
+        try:
+            path_stat = os.stat(self.path)
+        except OSError:
+            return False
+        file_stat = os.fstat(self._file.fileno())
+        if (path_stat.st_dev, path_stat.st_ino) != \
+                (file_stat.st_dev, file_stat.st_ino):
+            return True
+        return file_stat.st_size < self._offset
+
+    def read(self):
+        """
+        Reads up to chunk_size bytes appended since the last read
+        into the window and returns the read content.
+        """
+        n_read_bytes, data = self._read_chunk()
+        self._slide()
+        return data
+
+    def _read_chunk(self):
+        if self._is_rotated():
+            self._open()
+        if self._file is None:
+            return 0, self._window[:0]
+        self._file.seek(self._offset)
+        data = self._file.read(self.chunk_size)
+        n_read_bytes = len(data)
+        self._offset += n_read_bytes
+        if self._decoder is not None:
+            data = self._decoder.decode(data)
+        self._window += data
+        return n_read_bytes, data
+
+    def _slide(self):
+        n_overflowed = len(self._window) - self.window_size
+        if n_overflowed <= 0:
+            return
+        line_end = self._window.find(self._newline, n_overflowed)
+        if line_end == -1 or line_end + 1 == len(self._window):
+            self._window = self._window[n_overflowed:]
+        else:
+            self._window = self._window[line_end + 1:]
+
+    def _consume_line(self, match):
+        end = match.end()
+        if end == 0 or self._window[end - 1:end] != self._newline:
+            end = self._window.find(self._newline, end) + 1
+        self._window = self._window[end:]
+
+    def search(self, pattern, timeout=None):
+        """
+        Returns the match object of the first match of pattern in
+        lines appended to the file. Appended content is polled every
+        interval seconds until timeout seconds pass. It returns None
+        if pattern isn't found. Only complete lines are searched.
+        Content until the end of the line that has the end of the
+        match is consumed so that the next search() searches lines
+        after the match. So "^" in pattern matches only the start of
+        the first line that isn't consumed. Use "(?m)^" to match the
+        start of any line.
+        """
+        pattern = PatternCache.default().compile(pattern)
+        if timeout is None:
+            timeout = self.timeout
+        deadline = time.time() + timeout
+        need_search = True
+        while True:
+            n_read_bytes, data = self._read_chunk()
+            if data:
+                need_search = True
+            if need_search:
+                need_search = False
+                end = self._window.rfind(self._newline) + 1
+                match = pattern.search(self._window, 0, end)
+                if match:
+                    self._consume_line(match)
+                    self._slide()
+                    return match
+            # The window is slid only after it's searched so that
+            # every appended line is searched.
+            self._slide()
+            if n_read_bytes > 0:
+                continue
+            if time.time() >= deadline:
+                return None
+            time.sleep(self.interval)
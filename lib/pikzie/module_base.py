@@ -14,27 +14,30 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import sys
+import inspect
+import contextvars
 
 from pikzie.core import *
 from pikzie.assertions import Assertions
 
 __all__ = []
 
-__current_test_case__ = None
+current_test_case = contextvars.ContextVar("current_test_case", default=None)
 current_module = sys.modules[__name__]
 assertions = {}
 for assertion in filter(lambda name: not name.startswith("_"), dir(Assertions)):
     def wrap_assertion(assertion):
         _assertion = getattr(Assertions, assertion)
         def run_assertion(*args, **kw_args):
-            if __current_test_case__ is None:
+            test_case = current_test_case.get()
+            if test_case is None:
                 def inspect_kw_arg(arg):
                     return arg + ("=%s" % kw_args[arg])
-                inspected_args = ", ".join(map(str, args) +
-                                           map(inspect_kw_arg, kw_args))
+                inspected_args = ", ".join(list(map(str, args)) +
+                                           list(map(inspect_kw_arg, kw_args)))
                 raise TypeError("did you mean: self.%s(%s)" % \
                                     (assertion, inspected_args))
-            return _assertion(__current_test_case__, *args, **kw_args)
+            return _assertion(test_case, *args, **kw_args)
         return run_assertion
     wrapped_assertion = wrap_assertion(assertion)
     assertions[assertion] = wrapped_assertion
@@ -63,8 +66,6 @@ def collect_test_case_from_module(self, module):
 TestLoader.test_case_collectors.append(collect_test_case_from_module)
 
 class ModuleBasedTestCase(TestCase):
-    __current_test_case__ = None
-
     def collect_test(cls):
         return cls._collect_test(cls.target_module, 0)
     collect_test = classmethod(collect_test)
@@ -87,18 +88,28 @@ class ModuleBasedTestCase(TestCase):
     def _run_setup(self, context):
         setup = getattr(self.__class__.target_module, "setup", None)
         if setup:
-            setup()
+            return setup()
 
     def _run_teardown(self, context):
         teardown = getattr(self.__class__.target_module, "teardown", None)
         if teardown:
-            teardown()
+            return teardown()
 
     def _run_test(self, context):
-        global __current_test_case__
-        before_test_case = __current_test_case__
+        token = current_test_case.set(self)
+        try:
+            result = TestCase._run_test(self, context)
+        finally:
+            current_test_case.reset(token)
+        if inspect.isawaitable(result):
+            result = self._run_with_current_test_case(result)
+        return result
+
+    async def _run_with_current_test_case(self, awaitable):
+        # Each task has its own context. So concurrently ran tests
+        # don't share the current test case.
+        token = current_test_case.set(self)
         try:
-            __current_test_case__ = self
-            return TestCase._run_test(self, context)
+            return await awaitable
         finally:
-            __current_test_case__ = before_test_case
+            current_test_case.reset(token)
@@ -0,0 +1,289 @@
+# Copyright (C) 2026  Kouhei Sutou <kou@clear-code.com>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import random
+import asyncio
+import concurrent.futures
+
+from pikzie.core import TestSuite, TestCaseRunner, TestRunnerContext, \
+    run_until_complete
+from pikzie.result_store import ResultStore
+from pikzie.pattern_cache import PatternCache
+
+__all__ = ["ProcessPoolTestSuite", "ThreadPoolTestSuite", "AsyncTestSuite"]
+
+def _collect_objects(test):
+    objects = [test]
+    if isinstance(test, TestCaseRunner):
+        objects.append(test.test_case)
+        objects.extend(test._tests)
+    elif isinstance(test, TestSuite):
+        for sub_test in test:
+            objects.extend(_collect_objects(sub_test))
+    return objects
+
+class EventRecorder(object):
+    """
+    Listener that records events of a test in a worker process so
+    that they can be replayed to the TestRunnerContext of the parent
+    process.
+
+    Tests, test cases and test suites are recorded as their index in
+    the objects list of the test because the parent process has the
+    same objects. Results are recorded with their attributes that
+    can be pickled. Attributes are collected by picklable_events()
+    after the test is ran because some results such as deduplicated
+    notifications are updated after they are reported.
+    """
+    def __init__(self, objects):
+        self.events = []
+        self._indexes = dict((id(object), i)
+                             for i, object in enumerate(objects))
+        self._elapsed = 0
+        self._n_assertions = 0
+
+    def _index(self, object):
+        return self._indexes[id(object)]
+
+    def _record(self, name, object, *args):
+        self.events.append((name, self._index(object)) + args)
+
+    def on_start_test_suite(self, context, test_suite):
+        self._record("start_test_suite", test_suite)
+
+    def on_finish_test_suite(self, context, test_suite):
+        self._record("finish_test_suite", test_suite)
+
+    def on_start_test_case(self, context, test_case):
+        self._record("start_test_case", test_case)
+
+    def on_finish_test_case(self, context, test_case):
+        self._record("finish_test_case", test_case)
+
+    def on_start_test(self, context, test):
+        self._record("start_test", test)
+
+    def on_finish_test(self, context, test):
+        elapsed = context.elapsed - self._elapsed
+        self._elapsed = context.elapsed
+        n_assertions = context.n_assertions - self._n_assertions
+        self._n_assertions = context.n_assertions
+        self._record("finish_test", test, elapsed, n_assertions,
+                     list(getattr(test, "try_call_statistics", ())))
+
+    def _on_result(self, context, result):
+        self._record("result", result.test, result)
+
+    on_success = _on_result
+    on_failure = _on_result
+    on_error = _on_result
+    on_pending = _on_result
+    on_omission = _on_result
+    on_notification = _on_result
+
+    def picklable_events(self):
+        events = []
+        for event in self.events:
+            if event[0] == "result":
+                result = event[2]
+                event = event[:2] + (result.__class__,
+                                     self._picklable_attributes(result))
+            events.append(event)
+        return events
+
+    def _picklable_attributes(self, result):
+        attributes = {}
+        for name, value in result.__dict__.items():
+            if name == "test":
+                continue
+            try:
+                pickle.dumps(value)
+            except Exception:
+                value = str(value)
+            attributes[name] = value
+        return attributes
+
+def _replay(context, objects, events):
+    for event in events:
+        name, object = event[0], objects[event[1]]
+        if name == "start_test":
+            context.n_tests += 1
+            context._notify(name, object)
+        elif name == "finish_test":
+            elapsed, n_assertions, try_call_statistics = event[2:]
+            object.try_call_statistics = try_call_statistics
+            context.elapsed += elapsed
+            context.pass_assertions(object, n_assertions)
+            context._notify(name, object)
+        elif name == "result":
+            result_class, attributes = event[2:]
+            result = result_class.__new__(result_class)
+            result.__dict__.update(attributes)
+            result.test = object
+            context._record_result(result)
+        else:
+            context._notify(name, object)
+
+_worker_tests = None
+_worker_context_options = None
+
+def _initialize_worker(tests, context_options):
+    global _worker_tests, _worker_context_options
+    _worker_tests = tests
+    _worker_context_options = context_options
+    random.seed()
+    ResultStore._reset_locks()
+    PatternCache._reset_locks()
+
+def _run_in_worker(index):
+    test = _worker_tests[index]
+    recorder = EventRecorder(_collect_objects(test))
+    context = TestRunnerContext(**_worker_context_options)
+    context.add_listener(recorder)
+    test.run(context)
+    pattern_cache_statistics = (context.n_pattern_cache_hits,
+                                context.n_pattern_cache_misses)
+    return (index, recorder.picklable_events(), pattern_cache_statistics,
+            context.need_interrupt())
+
+class ProcessPoolTestSuite(TestSuite):
+    """
+    A test suite that runs its tests in a pool of worker processes.
+
+    Each test added to the suite (normally a TestCaseRunner) is a
+    unit of work. Workers run units and send recorded events back
+    to the parent process, which replays them to its
+    TestRunnerContext per unit. So listeners such as the console UI
+    and the XML report work as in sequential run.
+
+    Worker processes are created by fork. If fork isn't available or
+    the suite is ran in a worker process, tests are ran sequentially.
+    """
+    def __init__(self, tests=(), n_workers=None):
+        TestSuite.__init__(self, tests)
+        self.n_workers = n_workers
+
+    def _multiprocessing_context(self):
+        try:
+            import multiprocessing
+        except ImportError:
+            return None
+        if "fork" not in multiprocessing.get_all_start_methods():
+            return None
+        if multiprocessing.current_process().daemon:
+            return None
+        return multiprocessing.get_context("fork")
+
+    def run(self, context):
+        multiprocessing_context = self._multiprocessing_context()
+        if multiprocessing_context is None or self.n_workers == 1:
+            TestSuite.run(self, context)
+            return
+
+        context.on_start_test_suite(self)
+        ResultStore.default().load()
+        context_options = {
+            "deduplicate_notifications": context.deduplicate_notifications,
+        }
+        pool = multiprocessing_context.Pool(self.n_workers,
+                                            _initialize_worker,
+                                            (self._tests, context_options))
+        try:
+            results = pool.imap_unordered(_run_in_worker,
+                                          range(len(self._tests)))
+            for index, events, pattern_cache_statistics, interrupted in results:
+                objects = _collect_objects(self._tests[index])
+                _replay(context, objects, events)
+                context.add_pattern_cache_statistics(*pattern_cache_statistics)
+                if interrupted:
+                    context.interrupt()
+                if context.need_interrupt():
+                    break
+            pool.close()
+        except KeyboardInterrupt:
+            context.interrupt()
+        finally:
+            pool.terminate()
+            pool.join()
+        context.on_finish_test_suite(self)
+
+class ThreadPoolTestSuite(TestSuite):
+    """
+    A test suite that runs its tests in a pool of threads.
+
+    Each test added to the suite (normally a TestCaseRunner) is a
+    unit of work. Units share the TestRunnerContext, which serializes
+    result recording and listener notification. This is suitable for
+    I/O bound tests. Tests in a unit are ran sequentially.
+    """
+    def __init__(self, tests=(), n_threads=None):
+        TestSuite.__init__(self, tests)
+        self.n_threads = n_threads
+
+    def run(self, context):
+        if self.n_threads == 1:
+            TestSuite.run(self, context)
+            return
+
+        context.on_start_test_suite(self)
+        executor = concurrent.futures.ThreadPoolExecutor(self.n_threads)
+        futures = []
+        try:
+            for test in self._tests:
+                futures.append(executor.submit(self._run_test, test, context))
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+        except KeyboardInterrupt:
+            context.interrupt()
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(True)
+        context.on_finish_test_suite(self)
+
+    def _run_test(self, test, context):
+        if context.need_interrupt():
+            return
+        test.run(context)
+
+class AsyncTestSuite(TestSuite):
+    """
+    A test suite that runs its tests concurrently on an event loop.
+
+    Tests in the suite (normally TestCaseRunners) are ran as tasks on
+    the event loop shared by tests in the current thread. At most
+    concurrency tests are ran at once. This is suitable for async
+    tests that mostly wait for I/O. Sync tests block the event loop
+    while they are running.
+    """
+    default_concurrency = 100
+
+    def __init__(self, tests=(), concurrency=None):
+        TestSuite.__init__(self, tests)
+        self.concurrency = concurrency or self.default_concurrency
+
+    def run(self, context):
+        context.on_start_test_suite(self)
+        try:
+            run_until_complete(self._run_async(context))
+        except KeyboardInterrupt:
+            context.interrupt()
+        context.on_finish_test_suite(self)
+
+    async def _run_async(self, context):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*[test.run_async(context, semaphore)
+                               for test in self._tests])
@@ -0,0 +1,88 @@
+# Copyright (C) 2026  Kouhei Sutou <kou@clear-code.com>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+import threading
+import collections
+
+class PatternCache(object):
+    """
+    A least recently used cache of compiled regular expressions.
+
+    re has an internal cache but it's small. Suites that use many
+    distinct patterns evict patterns from it before they are used
+    again. Assertions and TestLoader compile patterns through the
+    default cache instead.
+    """
+
+    max_size = 1024
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def default(cls):
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+    default = classmethod(default)
+
+    def _reset_locks(cls):
+        """
+        Used by forked workers like ResultStore._reset_locks().
+        """
+        cls._default_lock = threading.Lock()
+        if cls._default is not None:
+            cls._default._lock = threading.Lock()
+    _reset_locks = classmethod(_reset_locks)
+
+    def __init__(self, max_size=None):
+        if max_size is not None:
+            self.max_size = max_size
+        self.n_hits = 0
+        self.n_misses = 0
+        self._patterns = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, pattern, flags=0):
+        """
+        Returns the compiled pattern. pattern is returned as is if
+        it's already compiled.
+        """
+        if not isinstance(pattern, (str, bytes)):
+            return pattern
+        key = (type(pattern), pattern, flags)
+        with self._lock:
+            compiled_pattern = self._patterns.get(key)
+            if compiled_pattern is not None:
+                self._patterns.move_to_end(key)
+                self.n_hits += 1
+                return compiled_pattern
+            self.n_misses += 1
+        compiled_pattern = re.compile(pattern, flags)
+        with self._lock:
+            self._patterns[key] = compiled_pattern
+            while len(self._patterns) > self.max_size:
+                self._patterns.popitem(last=False)
+        return compiled_pattern
+
+    def clear(self):
+        with self._lock:
+            self._patterns.clear()
+            self.n_hits = 0
+            self.n_misses = 0
+
+    def __len__(self):
+        return len(self._patterns)
@@ -14,12 +14,182 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import re
+import time
+import collections
 import types
 import difflib
 import pprint
 
+# Containers that have more than format_max_items elements in total
+# and strings that are longer than format_max_length characters are
+# truncated by format(). Formatted results are also truncated to
+# format_max_length characters.
+format_max_items = 10000
+format_max_length = 1000000
+
+def _format_number(number):
+    return "{0:,}".format(number)
+
+class _Omitted(object):
+    """
+    A marker for omitted items. It's sorted after other objects
+    because pprint sorts dictionary keys and set elements.
+    """
+    def __init__(self, n_items):
+        self.n_items = n_items
+
+    def __repr__(self):
+        return "... %s more items" % _format_number(self.n_items)
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+class _OmittedValue(object):
+    def __repr__(self):
+        return "..."
+
+class _TruncatedString(object):
+    def __init__(self, string, max_length):
+        self.string = string[:max_length]
+        self.n_omitted_characters = len(string) - max_length
+
+    def __repr__(self):
+        return "%r ... %s more characters" % \
+            (self.string, _format_number(self.n_omitted_characters))
+
+    def __lt__(self, other):
+        if isinstance(other, _TruncatedString):
+            return self.string < other.string
+        return NotImplemented
+
+class _Formatted(object):
+    """
+    A formatted object in a snapshot. Objects that can't be copied
+    are formatted when they are copied so that the snapshot doesn't
+    refer to objects that may be changed later.
+    """
+    def __init__(self, formatted):
+        self.formatted = formatted
+
+    def __repr__(self):
+        return self.formatted
+
+    def __lt__(self, other):
+        if isinstance(other, _Formatted):
+            return self.formatted < other.formatted
+        return NotImplemented
+
+_immutable_types = (int, float, complex, bool, type(None), type)
+
+class _Snapshot(object):
+    """
+    Copies an object with truncating containers and strings in it.
+    Elements are counted in depth first order and the rest are
+    replaced with a marker when format_max_items elements are
+    copied. Objects that aren't built-in containers are formatted
+    (and truncated) instead of being referred.
+    """
+    def __init__(self, max_items, max_length):
+        self.n_rest_items = max_items
+        self.max_length = max_length
+        self.copying_ids = set()
+
+    def copy(self, object):
+        object_type = type(object)
+        if object_type in (str, bytes):
+            if len(object) > self.max_length:
+                return _TruncatedString(object, self.max_length)
+            return object
+        if isinstance(object, _immutable_types):
+            return object
+        if id(object) in self.copying_ids:
+            return _Formatted("<Recursion on %s with id=%d>" % \
+                                  (object_type.__name__, id(object)))
+        self.copying_ids.add(id(object))
+        try:
+            if object_type is dict:
+                return self._copy_dict(object)
+            elif object_type in (list, tuple, set, frozenset):
+                return object_type(self._copy_items(object))
+            else:
+                return self._format(object)
+        finally:
+            self.copying_ids.remove(id(object))
+
+    def _format(self, object):
+        if isinstance(object, dict):
+            copied = self._copy_dict(object)
+        elif isinstance(object, (list, set, frozenset, collections.deque)) or \
+                (isinstance(object, tuple) and not hasattr(object, "_fields")):
+            copied = list(self._copy_items(object))
+        else:
+            formatted = pprint.pformat(object)
+            if len(formatted) > self.max_length:
+                formatted = repr(_TruncatedString(formatted, self.max_length))
+            return _Formatted(formatted)
+        return _Formatted("%s(%s)" % (type(object).__name__,
+                                      pprint.pformat(copied)))
+
+    def _copy_items(self, items):
+        copied_items = []
+        n_items = len(items)
+        for item in items:
+            if self.n_rest_items <= 0:
+                copied_items.append(_Omitted(n_items - len(copied_items)))
+                break
+            self.n_rest_items -= 1
+            copied_items.append(self.copy(item))
+        return copied_items
+
+    def _copy_dict(self, dictionary):
+        copied_dictionary = {}
+        for key, value in dictionary.items():
+            if self.n_rest_items <= 0:
+                n_omitted_items = len(dictionary) - len(copied_dictionary)
+                copied_dictionary[_Omitted(n_omitted_items)] = _OmittedValue()
+                break
+            self.n_rest_items -= 1
+            copied_dictionary[self.copy(key)] = self.copy(value)
+        return copied_dictionary
+
+def _snapshot(object):
+    return _Snapshot(format_max_items, format_max_length).copy(object)
+
+def _format_snapshot(snapshot):
+    formatted = pprint.pformat(snapshot)
+    if len(formatted) > format_max_length:
+        n_omitted_characters = len(formatted) - format_max_length
+        formatted = "%s\n... %s more characters" % \
+            (formatted[:format_max_length],
+             _format_number(n_omitted_characters))
+    return formatted
+
 def format(object):
-    return pprint.pformat(object)
+    return _format_snapshot(_snapshot(object))
+
+class LazyFormat(object):
+    """
+    Formats an object by format() when it's converted to a string.
+
+    Only a truncated copy of the object is kept until it's
+    formatted. Objects that aren't built-in containers are formatted
+    when it's created. The copy is released after it's formatted.
+    """
+    def __init__(self, object):
+        self._snapshot = _snapshot(object)
+        self._formatted = None
+
+    def __str__(self):
+        if self._formatted is None:
+            self._formatted = _format_snapshot(self._snapshot)
+            self._snapshot = None
+        return self._formatted
+
+    def __repr__(self):
+        return str(self)
 
 _re_class = type(re.compile(""))
 def _re_flags(pattern):
@@ -92,19 +262,251 @@ def format_exception_class(exception_class):
         return format(exception_class)
 
 def format_for_diff(object):
-    if not isinstance(object, str):
+    if isinstance(object, LazyFormat):
+        object = str(object)
+    elif not isinstance(object, str):
         object = format(object)
     return object
 
-def format_diff(string1, string2):
-    def ensure_newline(string):
-        if string.endswith("\n"):
-            return string
+# Inputs that are smaller than these limits are compared by
+# difflib.ndiff, which also shows changed characters in a line. Larger
+# inputs are compared by _diff_lines, which is a linear space Myers
+# diff, and only changed lines with diff_context_lines context lines
+# around them are shown. If the comparison takes more than
+# diff_time_budget seconds or inputs have more than diff_max_lines
+# lines, only the first difference is shown.
+ndiff_max_lines = 100
+ndiff_max_size = 16 * 1024
+diff_context_lines = 3
+diff_time_budget = 1.0
+diff_max_lines = 1000000
+
+class DiffBudgetExceeded(Exception):
+    pass
+
+def _split_lines(string):
+    if not string.endswith("\n"):
+        string += "\n"
+    return string.splitlines(True)
+
+def _is_small_for_ndiff(string1, string2):
+    if len(string1) + len(string2) > ndiff_max_size:
+        return False
+    return string1.count("\n") + string2.count("\n") <= ndiff_max_lines
+
+def format_diff(string1, string2, context_lines=None, time_budget=None):
+    lines1 = _split_lines(string1)
+    lines2 = _split_lines(string2)
+    if _is_small_for_ndiff(string1, string2):
+        return "".join(difflib.ndiff(lines1, lines2)).rstrip()
+
+    if context_lines is None:
+        context_lines = diff_context_lines
+    if time_budget is None:
+        time_budget = diff_time_budget
+    try:
+        if len(lines1) + len(lines2) > diff_max_lines:
+            raise DiffBudgetExceeded()
+        operations = _diff_lines(lines1, lines2, time.time() + time_budget)
+    except DiffBudgetExceeded:
+        return _format_first_difference(lines1, lines2)
+    return _format_hunks(lines1, lines2, operations, context_lines).rstrip()
+
+def _format_first_difference(lines1, lines2):
+    i = 0
+    n_lines = min(len(lines1), len(lines2))
+    while i < n_lines and lines1[i] == lines2[i]:
+        i += 1
+    result = ["diff is too large: first difference at line %d\n" % (i + 1)]
+    if i < len(lines1):
+        result.append("- " + lines1[i])
+    if i < len(lines2):
+        result.append("+ " + lines2[i])
+    return "".join(result).rstrip()
+
+def _format_hunks(lines1, lines2, operations, context_lines):
+    hunks = []
+    hunk = None
+    i1 = i2 = 0
+    for index, (operation, n_lines) in enumerate(operations):
+        if operation == "=":
+            if hunk is not None:
+                n_trailing_lines = min(n_lines, context_lines)
+                hunk["lines"].extend(["  " + line for line in
+                                      lines1[i1:i1 + n_trailing_lines]])
+                hunk["end1"] = i1 + n_trailing_lines
+                hunk["end2"] = i2 + n_trailing_lines
+                if n_lines > context_lines * 2 or \
+                        index == len(operations) - 1:
+                    hunks.append(hunk)
+                    hunk = None
+                else:
+                    hunk["lines"].extend(["  " + line for line in
+                                          lines1[i1 + n_trailing_lines:
+                                                 i1 + n_lines]])
+            i1 += n_lines
+            i2 += n_lines
+            continue
+
+        if hunk is None:
+            n_leading_lines = min(i1, i2, context_lines)
+            hunk = {
+                "start1": i1 - n_leading_lines,
+                "start2": i2 - n_leading_lines,
+                "lines": ["  " + line for line in
+                          lines1[i1 - n_leading_lines:i1]],
+            }
+        if operation == "-":
+            hunk["lines"].extend(["- " + line for line in
+                                  lines1[i1:i1 + n_lines]])
+            i1 += n_lines
         else:
-            return string + "\n"
-    diff = difflib.ndiff(ensure_newline(string1).splitlines(True),
-                         ensure_newline(string2).splitlines(True))
-    return "".join(diff).rstrip()
+            hunk["lines"].extend(["+ " + line for line in
+                                  lines2[i2:i2 + n_lines]])
+            i2 += n_lines
+        hunk["end1"] = i1
+        hunk["end2"] = i2
+    if hunk is not None:
+        hunks.append(hunk)
+
+    result = []
+    for hunk in hunks:
+        result.append("@@ -%d,%d +%d,%d @@\n" % \
+                          (hunk["start1"] + 1, hunk["end1"] - hunk["start1"],
+                           hunk["start2"] + 1, hunk["end2"] - hunk["start2"]))
+        result.extend(hunk["lines"])
+    return "".join(result)
+
+def _diff_lines(lines1, lines2, deadline):
+    """
+    Returns differences between lines1 and lines2 as a list of
+    (operation, n_lines). operation is "=", "-" or "+".
+    """
+    ids = {}
+    sequence1 = [ids.setdefault(line, len(ids)) for line in lines1]
+    sequence2 = [ids.setdefault(line, len(ids)) for line in lines2]
+    operations = []
+    n_deleted_lines = n_inserted_lines = 0
+    for operation, n_lines in _diff_sequences(sequence1, sequence2, deadline):
+        if operation == "-":
+            n_deleted_lines += n_lines
+        elif operation == "+":
+            n_inserted_lines += n_lines
+        elif n_lines > 0:
+            _append_changes(operations, n_deleted_lines, n_inserted_lines)
+            n_deleted_lines = n_inserted_lines = 0
+            if operations and operations[-1][0] == "=":
+                operations[-1] = ("=", operations[-1][1] + n_lines)
+            else:
+                operations.append(("=", n_lines))
+    _append_changes(operations, n_deleted_lines, n_inserted_lines)
+    return operations
+
+def _append_changes(operations, n_deleted_lines, n_inserted_lines):
+    if n_deleted_lines > 0:
+        operations.append(("-", n_deleted_lines))
+    if n_inserted_lines > 0:
+        operations.append(("+", n_inserted_lines))
+
+def _diff_sequences(sequence1, sequence2, deadline):
+    n_prefix = 0
+    n_common = min(len(sequence1), len(sequence2))
+    while n_prefix < n_common and \
+            sequence1[n_prefix] == sequence2[n_prefix]:
+        n_prefix += 1
+    n_suffix = 0
+    n_common -= n_prefix
+    while n_suffix < n_common and \
+            sequence1[-1 - n_suffix] == sequence2[-1 - n_suffix]:
+        n_suffix += 1
+    middle1 = sequence1[n_prefix:len(sequence1) - n_suffix]
+    middle2 = sequence2[n_prefix:len(sequence2) - n_suffix]
+
+    operations = [("=", n_prefix)]
+    if not middle1:
+        operations.append(("+", len(middle2)))
+    elif not middle2:
+        operations.append(("-", len(middle1)))
+    else:
+        operations.extend(_bisect(middle1, middle2, deadline))
+    operations.append(("=", n_suffix))
+    return operations
+
+def _bisect(sequence1, sequence2, deadline):
+    """
+    Finds the middle snake of the shortest edit script by searching
+    from both ends at the same time and diffs the both sides of it
+    recursively. See "An O(ND) Difference Algorithm and Its
+    Variations" by Eugene W. Myers.
+    """
+    n = len(sequence1)
+    m = len(sequence2)
+    max_d = (n + m + 1) // 2
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2 = [-1] * v_length
+    v2[v_offset + 1] = 0
+    delta = n - m
+    front = (delta % 2 != 0)
+    k1_start = k1_end = k2_start = k2_end = 0
+    for d in range(max_d):
+        if time.time() > deadline:
+            raise DiffBudgetExceeded()
+
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and sequence1[x1] == sequence2[y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1_end += 2
+            elif y1 > m:
+                k1_start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                    if x1 >= n - v2[k2_offset]:
+                        return _bisect_split(sequence1, sequence2,
+                                             x1, y1, deadline)
+
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and \
+                    sequence1[n - x2 - 1] == sequence2[m - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = v_offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return _bisect_split(sequence1, sequence2,
+                                             x1, y1, deadline)
+
+    return [("-", n), ("+", m)]
+
+def _bisect_split(sequence1, sequence2, x, y, deadline):
+    return _diff_sequences(sequence1[:x], sequence2[:y], deadline) + \
+        _diff_sequences(sequence1[x:], sequence2[y:], deadline)
 
 def is_interested_diff(diff):
     if not diff:
@@ -128,14 +530,209 @@ def fold(string):
 def format_folded_diff(string1, string2):
     return format_diff(fold(string1), fold(string2))
 
+def format_diffs(string1, string2):
+    """
+    Returns diff of string1 and string2 and their folded diff as
+    (diff, folded_diff). diff is None if it isn't interested.
+    folded_diff is None if it isn't needed. Folded diff is computed
+    only for inputs that are compared by difflib.ndiff because it
+    doesn't help for large inputs.
+    """
+    diff = format_diff(string1, string2)
+    folded_diff = None
+    if need_fold(diff) and _is_small_for_ndiff(string1, string2):
+        folded_diff = format_folded_diff(string1, string2)
+    if not is_interested_diff(diff):
+        diff = None
+    return diff, folded_diff
+
 def append_diff(message, target1, target2):
-    formatted_target1 = format_for_diff(target1)
-    formatted_target2 = format_for_diff(target2)
-    diff = format_diff(formatted_target1, formatted_target2)
-    if is_interested_diff(diff):
+    diff, folded_diff = format_diffs(format_for_diff(target1),
+                                     format_for_diff(target2))
+    if diff:
         message = "%s\n\ndiff:\n%s" % (message, diff)
-    if need_fold(diff):
-        folded_diff = format_folded_diff(formatted_target1, formatted_target2)
+    if folded_diff:
         message = "%s\n\nfolded diff:\n%s" % (message, folded_diff)
     return message
 
+
+# format_hexdump_diff() shows this number of rows before and after
+# the row that has the first difference.
+hexdump_context_rows = 2
+
+def _format_hexdump_row(view, offset, width, base):
+    row = view[offset:offset + width].tobytes()
+    hex_bytes = " ".join(["%02x" % byte for byte in bytearray(row)])
+    characters = "".join([(32 <= byte < 127) and chr(byte) or "."
+                          for byte in bytearray(row)])
+    return "%08x: %-*s |%s|" % (base + offset, width * 3 - 1, hex_bytes,
+                                characters)
+
+def format_hexdump_diff(view1, view2, offset, width=16, context_rows=None,
+                        base=0):
+    """
+    Formats hexdump of bytes-like objects view1 and view2 around
+    offset, where the first difference is. Rows that have
+    differences are shown as "- " row of view1, "+ " row of view2
+    and "? " row that marks different bytes. base is added to
+    shown offsets for views that are windows of larger data.
+    """
+    if context_rows is None:
+        context_rows = hexdump_context_rows
+    row_offset = offset - offset % width
+    start = max(0, row_offset - context_rows * width)
+    end = row_offset + (context_rows + 1) * width
+    lines = []
+    for offset in range(start, end, width):
+        row1 = view1[offset:offset + width].tobytes()
+        row2 = view2[offset:offset + width].tobytes()
+        if not row1 and not row2:
+            break
+        if row1 == row2:
+            lines.append("  " + _format_hexdump_row(view1, offset, width,
+                                                    base))
+            continue
+        if row1:
+            lines.append("- " + _format_hexdump_row(view1, offset, width,
+                                                    base))
+        if row2:
+            lines.append("+ " + _format_hexdump_row(view2, offset, width,
+                                                    base))
+        marks = []
+        for i in range(width):
+            if row1[i:i + 1] == row2[i:i + 1]:
+                marks.append("  ")
+            else:
+                marks.append("^^")
+        lines.append(("? %8s  %s" % ("", " ".join(marks))).rstrip())
+    return "\n".join(lines)
+
+# structural_diff() stops after finding this number of differences
+# by default.
+structural_diff_max_differences = 10
+
+class _TooManyDifferences(Exception):
+    pass
+
+def _equal(object1, object2):
+    try:
+        return bool(object1 == object2)
+    except Exception:
+        return False
+
+def _is_structured(object1, object2):
+    if isinstance(object1, dict) and isinstance(object2, dict):
+        return True
+    if type(object1) is not type(object2):
+        return False
+    if isinstance(object1, (list, tuple)):
+        return True
+    if isinstance(object1, (type, types.ModuleType)):
+        return False
+    return hasattr(object1, "__dict__")
+
+class _StructuralDiff(object):
+    missing = "<missing>"
+
+    def __init__(self, max_differences):
+        self.max_differences = max_differences
+        self.differences = []
+        self.comparing_ids = set()
+
+    def compare(self, expected, actual, path):
+        if _equal(expected, actual):
+            return
+        ids = (id(expected), id(actual))
+        if not _is_structured(expected, actual) or ids in self.comparing_ids:
+            self.add_leaf(path, expected, actual)
+            return
+        self.comparing_ids.add(ids)
+        try:
+            if isinstance(expected, dict):
+                self._compare_dict(expected, actual, path)
+            elif isinstance(expected, (list, tuple)):
+                self._compare_sequence(expected, actual, path)
+            else:
+                n_differences = len(self.differences)
+                self._compare_dict(vars(expected), vars(actual), path, True)
+                if len(self.differences) == n_differences:
+                    self.add(path, format(expected), format(actual))
+        finally:
+            self.comparing_ids.remove(ids)
+
+    def add(self, path, formatted_expected, formatted_actual, diffs=()):
+        if len(self.differences) == self.max_differences:
+            raise _TooManyDifferences()
+        lines = ["%s: %s != %s" % (path, formatted_expected, formatted_actual)]
+        for label, diff in diffs:
+            if not diff:
+                continue
+            lines.append("  %s:" % label)
+            lines.extend(["    %s" % line for line in diff.split("\n")])
+        self.differences.append("\n".join(lines))
+
+    def add_leaf(self, path, expected, actual):
+        """
+        Adds a difference of objects that aren't walked. Different
+        strings are also shown with their diff because changed
+        characters are hard to find in long strings.
+        """
+        formatted_expected = format(expected)
+        formatted_actual = format(actual)
+        diffs = ()
+        if (isinstance(expected, str) and isinstance(actual, str)) or \
+                (isinstance(expected, bytes) and isinstance(actual, bytes)):
+            diff, folded_diff = format_diffs(formatted_expected,
+                                             formatted_actual)
+            diffs = (("diff", diff), ("folded diff", folded_diff))
+        self.add(path, formatted_expected, formatted_actual, diffs)
+
+    def _compare_dict(self, expected, actual, path, attribute=False):
+        for key, value in expected.items():
+            key_path = self._key_path(path, key, attribute)
+            if key in actual:
+                self.compare(value, actual[key], key_path)
+            else:
+                self.add(key_path, format(value), self.missing)
+        for key, value in actual.items():
+            if key not in expected:
+                key_path = self._key_path(path, key, attribute)
+                self.add(key_path, self.missing, format(value))
+
+    def _key_path(self, path, key, attribute):
+        if attribute:
+            return "%s.%s" % (path, key)
+        else:
+            return "%s[%s]" % (path, format(key))
+
+    def _compare_sequence(self, expected, actual, path):
+        n_common_items = min(len(expected), len(actual))
+        for i in range(n_common_items):
+            self.compare(expected[i], actual[i], "%s[%d]" % (path, i))
+        for i in range(n_common_items, len(expected)):
+            self.add("%s[%d]" % (path, i), format(expected[i]), self.missing)
+        for i in range(n_common_items, len(actual)):
+            self.add("%s[%d]" % (path, i), self.missing, format(actual[i]))
+
+def structural_diff(expected, actual, max_differences=None):
+    """
+    Compares expected and actual by walking them in tandem and
+    returns differences as a list of path addressed lines such as
+    "[3]['items'][1042].price: 10 != 11". It stops after finding
+    max_differences differences and "..." is appended in the case.
+
+    It returns None if expected and actual aren't containers or
+    objects of the same class.
+    """
+    if not _is_structured(expected, actual):
+        return None
+    if max_differences is None:
+        max_differences = structural_diff_max_differences
+    diff = _StructuralDiff(max_differences)
+    try:
+        diff.compare(expected, actual, "")
+    except _TooManyDifferences:
+        diff.differences.append("...")
+    if not diff.differences:
+        return None
+    return diff.differences
@@ -0,0 +1,407 @@
+# Copyright (C) 2026  Kouhei Sutou <kou@clear-code.com>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+import time
+import codecs
+import select
+import signal
+import tempfile
+import threading
+import subprocess
+
+from pikzie.pattern_cache import PatternCache
+
+class CommandRunner(object):
+    """
+    Runs a command and captures its output without deadlock.
+
+    Output of the command is drained by threads while the command is
+    running so that the command isn't blocked by a full pipe. Output
+    is kept in memory up to spool_size bytes and spilled to a
+    temporary file over it. process.stdout and process.stderr are
+    replaced with the captured output after wait().
+
+    If timeout is given, the command is ran in a new process group
+    and the process group is killed when the command isn't finished
+    in timeout seconds.
+
+    Output is read until its end even after the command exits. But
+    an output that is kept open by a background process started by
+    the command is given up when nothing is read from it for
+    idle_timeout_after_exit seconds after the command exits. Names of
+    given up outputs ("stdout" or "stderr") are in truncated_outputs.
+    """
+
+    spool_size = 1024 * 1024
+    chunk_size = 64 * 1024
+    idle_timeout_after_exit = 0.1
+    join_timeout_after_kill = 1
+
+    def __init__(self, command, timeout=None, spool_size=None,
+                 **popen_kw_args):
+        self.command = command
+        self.timeout = timeout
+        if spool_size is not None:
+            self.spool_size = spool_size
+        self.popen_kw_args = {
+            "stdin": subprocess.PIPE,
+            "stdout": subprocess.PIPE,
+            "stderr": subprocess.PIPE,
+        }
+        self.popen_kw_args.update(popen_kw_args)
+        self._new_session = False
+        if timeout is not None and hasattr(os, "killpg") and \
+                "start_new_session" not in self.popen_kw_args and \
+                "preexec_fn" not in self.popen_kw_args:
+            self.popen_kw_args["start_new_session"] = True
+            self._new_session = True
+        self.process = None
+        self.timed_out = False
+        self.truncated_outputs = []
+        self._threads = []
+        self._lock = threading.Lock()
+        self._last_read_times = {}
+        self._pipes = {}
+
+    def start(self):
+        """
+        Starts the command. OSError is raised if the command can't
+        be ran.
+        """
+        self.process = subprocess.Popen(self.command, **self.popen_kw_args)
+        if self.process.stdin is not None:
+            self.process.stdin.close()
+        for name in ("stdout", "stderr"):
+            pipe = getattr(self.process, name)
+            if pipe is None:
+                continue
+            if isinstance(pipe, io.TextIOBase):
+                mode = "w+"
+            else:
+                mode = "w+b"
+            spool = tempfile.SpooledTemporaryFile(self.spool_size, mode)
+            setattr(self.process, name, spool)
+            self._last_read_times[name] = time.time()
+            self._pipes[name] = pipe
+            thread = threading.Thread(target=self._drain,
+                                      args=(name, pipe, spool))
+            thread.daemon = True
+            thread.start()
+            self._threads.append((name, thread))
+        return self.process
+
+    def _drain(self, name, pipe, spool):
+        decoder = None
+        if isinstance(pipe, io.TextIOWrapper):
+            decoder_class = codecs.getincrementaldecoder(pipe.encoding)
+            decoder = io.IncrementalNewlineDecoder(decoder_class(pipe.errors),
+                                                   True)
+            pipe = pipe.buffer
+        try:
+            while True:
+                # read1() returns available data without waiting for
+                # chunk_size bytes. So output is captured even when
+                # the pipe is kept open by a background process.
+                data = pipe.read1(self.chunk_size)
+                if decoder is not None:
+                    data = decoder.decode(data, not data)
+                with self._lock:
+                    if name in self.truncated_outputs:
+                        break
+                    if data:
+                        spool.write(data)
+                        self._last_read_times[name] = time.time()
+                if not data:
+                    break
+        finally:
+            with self._lock:
+                del self._pipes[name]
+                pipe.close()
+
+    def _is_idle(self, name):
+        """
+        Returns True if no data is waiting to be read from the output.
+        """
+        with self._lock:
+            pipe = self._pipes.get(name)
+            if pipe is None:
+                return True
+            return not select.select([pipe], [], [], 0)[0]
+
+    def wait(self):
+        """
+        Waits for the command and the captured output. Returns the
+        exit code of the command.
+
+        Outputs are read until their ends. An output that has no
+        data to be read for idle_timeout_after_exit seconds after the
+        command exits is given up and added to truncated_outputs.
+        """
+        idle_timeout = self.idle_timeout_after_exit
+        try:
+            self.process.wait(self.timeout)
+        except subprocess.TimeoutExpired:
+            self.timed_out = True
+            self.kill()
+            self.process.wait()
+            idle_timeout = self.join_timeout_after_kill
+        exit_time = time.time()
+        for name, thread in self._threads:
+            while thread.is_alive():
+                with self._lock:
+                    last_read_time = max(self._last_read_times[name],
+                                         exit_time)
+                rest = last_read_time + idle_timeout - time.time()
+                if rest <= 0:
+                    # The thread may not read available data yet
+                    # because it isn't scheduled.
+                    if self._is_idle(name):
+                        break
+                    rest = idle_timeout
+                thread.join(rest)
+        with self._lock:
+            for name, thread in self._threads:
+                if thread.is_alive():
+                    self.truncated_outputs.append(name)
+            for name in ("stdout", "stderr"):
+                spool = getattr(self.process, name)
+                if spool is not None:
+                    spool.seek(0)
+        return self.process.returncode
+
+    def kill(self):
+        if self._new_session:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                return
+            except OSError:
+                pass
+        self.process.kill()
+
+    def run(self):
+        self.start()
+        return self.wait()
+
+class SpawnedProcess(object):
+    """
+    Runs a command and waits for patterns in its output like expect.
+
+    stdout and stderr of the command are read by threads while the
+    command is running and kept in a sliding window that has at most
+    window_size characters (or bytes if encoding is None). Output of
+    stdout and stderr is mixed in the window. So the command isn't
+    blocked by a full pipe and the window is searched incrementally.
+    stdin of the command can be written by send(). While expect() is
+    waiting, new output is searched before the window is slid.
+
+      spawned = SpawnedProcess(["my-server", "--port", "8080"])
+      spawned.start()
+      try:
+          spawned.expect("(?m)^Ready", 5)   # => match object or None
+          ...
+      finally:
+          spawned.close()
+    """
+
+    window_size = 64 * 1024
+    timeout = 10
+    chunk_size = 64 * 1024
+
+    def __init__(self, command, encoding="utf-8", window_size=None,
+                 **popen_kw_args):
+        self.command = command
+        self.encoding = encoding
+        if window_size is not None:
+            self.window_size = window_size
+        self.popen_kw_args = {
+            "stdin": subprocess.PIPE,
+            "stdout": subprocess.PIPE,
+            "stderr": subprocess.PIPE,
+        }
+        if hasattr(os, "killpg"):
+            self.popen_kw_args["start_new_session"] = True
+        self.popen_kw_args.update(popen_kw_args)
+        if encoding is None:
+            self._window = b""
+        else:
+            self._window = ""
+        self.process = None
+        self._condition = threading.Condition()
+        self._threads = []
+        self._n_running_threads = 0
+        self._expected_pattern = None
+        self._expected_match = None
+
+    def content(self):
+        """
+        Returns the output in the window that isn't consumed by
+        expect() yet.
+        """
+        with self._condition:
+            return self._window
+    content = property(content)
+
+    def start(self):
+        """
+        Starts the command. OSError is raised if the command can't
+        be ran.
+        """
+        self.process = subprocess.Popen(self.command, **self.popen_kw_args)
+        for pipe in (self.process.stdout, self.process.stderr):
+            if pipe is None:
+                continue
+            thread = threading.Thread(target=self._read, args=(pipe,))
+            thread.daemon = True
+            self._threads.append(thread)
+        self._n_running_threads = len(self._threads)
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __enter__(self):
+        if self.process is None:
+            self.start()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def _read(self, pipe):
+        if self.encoding is None:
+            decoder = None
+        else:
+            decoder_class = codecs.getincrementaldecoder(self.encoding)
+            decoder = decoder_class(errors="replace")
+        try:
+            while True:
+                data = os.read(pipe.fileno(), self.chunk_size)
+                if decoder is not None:
+                    data = decoder.decode(data, not data)
+                with self._condition:
+                    if data:
+                        self._window += data
+                        self._search_expected()
+                        self._slide()
+                    self._condition.notify_all()
+                if not data:
+                    break
+        except OSError:
+            pass
+        finally:
+            with self._condition:
+                self._n_running_threads -= 1
+                self._condition.notify_all()
+
+    def _search_expected(self):
+        # The window is searched by the reader thread before it's
+        # slid so that output of a burst that is larger than the
+        # window isn't dropped without being searched.
+        if self._expected_pattern is None:
+            return
+        match = self._expected_pattern.search(self._window)
+        if match:
+            self._window = self._window[match.end():]
+            self._expected_pattern = None
+            self._expected_match = match
+
+    def _slide(self):
+        n_overflowed = len(self._window) - self.window_size
+        if n_overflowed > 0:
+            self._window = self._window[n_overflowed:]
+
+    def is_eof(self):
+        """
+        Returns True if the command closed all of its output.
+        """
+        with self._condition:
+            return self._n_running_threads == 0
+
+    def expect(self, pattern, timeout=None):
+        """
+        Waits until pattern is found in the output of the command
+        for timeout seconds and returns the match object. It returns
+        None if pattern isn't found before timeout or the end of the
+        output. Output until the end of the match is consumed so that
+        the next expect() searches output after the match. "^" in
+        pattern matches only the start of the output that isn't
+        consumed. It may be the middle of a line such as the newline
+        after the previous match. Use "(?m)^" to match the start of
+        any line.
+        """
+        pattern = PatternCache.default().compile(pattern)
+        if timeout is None:
+            timeout = self.timeout
+        deadline = time.time() + timeout
+        with self._condition:
+            match = pattern.search(self._window)
+            if match:
+                self._window = self._window[match.end():]
+                return match
+            self._expected_pattern = pattern
+            self._expected_match = None
+            try:
+                while self._expected_match is None:
+                    if self._n_running_threads == 0:
+                        return None
+                    rest = deadline - time.time()
+                    if rest <= 0:
+                        return None
+                    self._condition.wait(rest)
+                return self._expected_match
+            finally:
+                self._expected_pattern = None
+                self._expected_match = None
+
+    def send(self, data):
+        """
+        Writes data to stdin of the command.
+        """
+        if self.encoding is not None and not isinstance(data, bytes):
+            data = data.encode(self.encoding)
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def close(self):
+        """
+        Kills the command if it's still running and waits for it.
+        Returns the exit code of the command.
+        """
+        if self.process is None:
+            return None
+        if self.process.stdin is not None:
+            try:
+                self.process.stdin.close()
+            except (IOError, OSError):
+                pass
+        if self.process.poll() is None:
+            self._kill()
+        self.process.wait()
+        for thread in self._threads:
+            thread.join(CommandRunner.join_timeout_after_kill)
+        for pipe in (self.process.stdout, self.process.stderr):
+            if pipe is not None:
+                pipe.close()
+        return self.process.returncode
+
+    def _kill(self):
+        if self.popen_kw_args.get("start_new_session"):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                return
+            except OSError:
+                pass
+        self.process.kill()
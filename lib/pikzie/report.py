@@ -13,7 +13,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import cgi
+from xml.sax.saxutils import escape
 
 class XML(object):
     def __init__(self, output):
@@ -60,7 +60,7 @@ class XML(object):
     def _write_tag(self, indent, name, content):
         if content:
             self._write("%s<%s>%s</%s>\n" % (indent, name,
-                                             cgi.escape(str(content)),
+                                             escape(str(content)),
                                              name))
         else:
             self._write("%s<%s/>\n" % (indent, name))
@@ -71,10 +71,19 @@ class XML(object):
         self._write_test(result.test)
         self._write_tag("    ", "status", result.name)
         self._write_tag("    ", "detail", result.detail())
+        self._write_differences(getattr(result, "differences", None))
         self._write_tag("    ", "elapsed", "%f" % result.elapsed)
         self._write_traceback(result.traceback)
         self._write("  </result>\n")
 
+    def _write_differences(self, differences):
+        if not differences:
+            return
+        self._write("    <differences>\n")
+        for difference in differences:
+            self._write_tag("      ", "difference", difference)
+        self._write("    </differences>\n")
+
     def _write_test_case(self, test_case):
         name = "%s.%s" % (test_case.__module__, test_case.__name__)
         description = test_case.__doc__
@@ -0,0 +1,208 @@
+# Copyright (C) 2026  Kouhei Sutou <kou@clear-code.com>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import errno
+import json
+import atexit
+import tempfile
+import threading
+
+class ResultStore(object):
+    """
+    Stores whether each test passed in the previous run.
+
+    Results are kept in a dictionary that is loaded from an
+    append-only log file at the first access. Changes are appended
+    to the log file in batches. The log file is compacted on load
+    when it has many stale entries.
+
+    Results stored by old Pikzie as .test-result/CASE/TEST/passed
+    files are imported when there is no log file yet.
+    """
+
+    directory_name = ".test-result"
+    file_name = "results.log"
+    batch_size = 1000
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def default(cls):
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(cls._find_directory())
+                atexit.register(cls._default.flush)
+            return cls._default
+    default = classmethod(default)
+
+    def _reset_locks(cls):
+        """
+        Resets locks in a forked process. They may be held by other
+        threads of the parent process, which don't exist in the
+        forked process.
+        """
+        cls._default_lock = threading.Lock()
+        if cls._default is not None:
+            cls._default._lock = threading.RLock()
+    _reset_locks = classmethod(_reset_locks)
+
+    def _find_directory(cls):
+        parent_directories = [os.path.dirname(sys.argv[0]),
+                              os.getcwd(),
+                              os.path.join(os.path.dirname(__file__), "..")]
+        if hasattr(os, "getuid"):
+            parent_directories.append(os.path.join(tempfile.gettempdir(),
+                                                   str(os.getuid())))
+        else:
+            parent_directories.append(os.path.join(tempfile.gettempdir(),
+                                                   str(os.getpid())))
+        for parent_directory in parent_directories:
+            directory = os.path.abspath(os.path.join(parent_directory,
+                                                     cls.directory_name))
+            if os.path.isdir(directory) and os.access(directory, os.W_OK):
+                return directory
+            try:
+                os.makedirs(directory)
+                return directory
+            except OSError:
+                pass
+
+        raise OSError(errno.EACCES, "Permission denied",
+                      ", ".join(parent_directories))
+    _find_directory = classmethod(_find_directory)
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, self.file_name)
+        self._results = None
+        self._pending_entries = []
+        self._lock = threading.RLock()
+
+    def load(self):
+        """
+        Loads results and writes pending changes. This should be
+        called before forking workers so that they don't load (and
+        compact) the log file concurrently nor write the same pending
+        changes.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self.flush()
+
+    def is_passed(self, test_case_name, test_name):
+        with self._lock:
+            self._ensure_loaded()
+            return self._results.get((test_case_name, test_name), False)
+
+    def set_passed(self, test_case_name, test_name, passed):
+        with self._lock:
+            self._ensure_loaded()
+            key = (test_case_name, test_name)
+            if self._results.get(key, False) == passed:
+                return
+            if passed:
+                self._results[key] = True
+            else:
+                del self._results[key]
+            self._pending_entries.append([test_case_name, test_name, passed])
+            if len(self._pending_entries) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending_entries:
+                return
+            self._append(self._pending_entries)
+            self._pending_entries = []
+
+    def _ensure_loaded(self):
+        if self._results is not None:
+            return
+        self._results = {}
+        if os.path.exists(self.path):
+            n_entries = self._load()
+            if n_entries > max(self.batch_size, len(self._results) * 2):
+                self._compact()
+        else:
+            self._migrate()
+
+    def _load(self):
+        n_entries = 0
+        log = open(self.path)
+        try:
+            for line in log:
+                try:
+                    test_case_name, test_name, passed = json.loads(line)
+                except ValueError:
+                    continue
+                n_entries += 1
+                key = (test_case_name, test_name)
+                if passed:
+                    self._results[key] = True
+                else:
+                    self._results.pop(key, None)
+        finally:
+            log.close()
+        return n_entries
+
+    def _format_entries(self, entries):
+        return "".join([json.dumps(entry) + "\n" for entry in entries])
+
+    def _append(self, entries):
+        log = open(self.path, "a")
+        try:
+            log.write(self._format_entries(entries))
+        finally:
+            log.close()
+
+    def _compact(self):
+        entries = [[test_case_name, test_name, True]
+                   for test_case_name, test_name in sorted(self._results)]
+        fd, path = tempfile.mkstemp(dir=self.directory)
+        log = os.fdopen(fd, "w")
+        try:
+            log.write(self._format_entries(entries))
+        finally:
+            log.close()
+        os.rename(path, self.path)
+
+    def _migrate(self):
+        if not os.path.isdir(self.directory):
+            return
+        test_directories = []
+        for test_case_name in os.listdir(self.directory):
+            test_case_directory = os.path.join(self.directory, test_case_name)
+            if not os.path.isdir(test_case_directory):
+                continue
+            for test_name in os.listdir(test_case_directory):
+                test_directory = os.path.join(test_case_directory, test_name)
+                if os.path.exists(os.path.join(test_directory, "passed")):
+                    self._results[(test_case_name, test_name)] = True
+                test_directories.append(test_directory)
+        if not test_directories:
+            return
+        self._compact()
+        for test_directory in test_directories:
+            try:
+                os.remove(os.path.join(test_directory, "passed"))
+            except OSError:
+                pass
+            try:
+                os.rmdir(test_directory)
+                os.rmdir(os.path.dirname(test_directory))
+            except OSError:
+                pass
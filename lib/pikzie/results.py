@@ -55,9 +55,13 @@ class Notification(TestResult):
         self.test = test
         self.message = message
         self.traceback = traceback
+        self.n_occurrences = 1
 
     def title(self):
-        return "Notification: %s: %s" % (self.test, self.message)
+        title = "Notification: %s: %s" % (self.test, self.message)
+        if self.n_occurrences > 1:
+            title += " (%d times)" % self.n_occurrences
+        return title
 
     def detail(self):
         return ""
@@ -99,7 +103,8 @@ class Pending(TestResult):
 class Failure(TestResult):
     name = "failure"
 
-    def __init__(self, test, message, traceback, expected=None, actual=None):
+    def __init__(self, test, message, traceback, expected=None, actual=None,
+                 differences=None):
         self.fault = True
         self.critical = True
         self.symbol = "F"
@@ -108,6 +113,7 @@ class Failure(TestResult):
         self.traceback = traceback
         self.expected = expected
         self.actual = actual
+        self.differences = differences
 
     def title(self):
         if len(self.traceback) == 0:
@@ -19,6 +19,7 @@ from optparse import OptionParser
 
 from pikzie.core import *
 from pikzie.ui.console import *
+from pikzie.parallel import *
 import pikzie.report
 
 class Tester(object):
@@ -54,12 +55,26 @@ class Tester(object):
             "priority_mode": options.pop("priority_mode")
         }
         xml_report = options.pop("xml_report")
+        n_workers = options.pop("n_workers")
+        n_threads = options.pop("n_threads")
+        async_concurrency = options.pop("async_concurrency")
+        context_options = {
+            "deduplicate_notifications":
+                options.pop("deduplicate_notifications"),
+        }
         test = TestLoader(**test_suite_create_options).create_test_suite(args)
+        if n_workers is not None and n_workers > 1:
+            test = ProcessPoolTestSuite(test, n_workers)
+        elif n_threads is not None and n_threads > 1:
+            test = ThreadPoolTestSuite(test, n_threads)
+        elif async_concurrency is not None:
+            test = AsyncTestSuite(test, async_concurrency)
         runner = ConsoleTestRunner(**options)
         listeners = []
         if xml_report:
             listeners.append(pikzie.report.XML(xml_report))
-        context = runner.run(test, listeners)
+        context = runner.run(test, listeners,
+                             TestRunnerContext(**context_options))
         if context.succeeded:
             return 0
         else:
@@ -94,8 +109,31 @@ class Tester(object):
                          dest="priority_mode", help="Use priority mode")
         group.add_option("--no-priority", action="store_false",
                          dest="priority_mode", help="Not use priority mode")
+        group.add_option("-j", "--workers", metavar="N",
+                         type="int", dest="n_workers",
+                         help="Run test cases in N worker processes")
+        group.add_option("--threads", metavar="N",
+                         type="int", dest="n_threads",
+                         help="Run test cases in N threads")
+        group.add_option("--async-concurrency", metavar="N",
+                         type="int", dest="async_concurrency",
+                         help="Run at most N tests concurrently "
+                         "on an event loop")
+        group.add_option("--deduplicate-notifications", action="store_true",
+                         default=False, dest="deduplicate_notifications",
+                         help="Report notifications from the same place "
+                         "in a test once with the number of occurrences")
         ConsoleTestRunner.setup_options(parser)
-        return parser.parse_args(args)
+        options, args = parser.parse_args(args)
+        if options.n_workers and options.n_threads:
+            parser.error("--workers and --threads are exclusive")
+        if options.async_concurrency is not None:
+            if options.n_workers or options.n_threads:
+                parser.error("--async-concurrency can't be used with "
+                             "--workers or --threads")
+            if options.async_concurrency < 1:
+                parser.error("--async-concurrency must be positive")
+        return options, args
 
 auto_test_run_reject_pattern = \
     r"\b(?:pydoc[\d.]*|setup\.py|ipython[\d.]*|easy_install[\d.]*)$"
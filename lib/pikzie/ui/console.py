@@ -17,6 +17,8 @@ import sys
 import os
 import math
 import re
+import time
+import threading
 
 from optparse import OptionValueError
 
@@ -77,15 +79,26 @@ class ConsoleTestRunner(object):
                          dest="verbose_level", nargs=1, type="string", help=help)
     setup_verbose_option = classmethod(setup_verbose_option)
 
+    def setup_flush_interval_option(cls, group):
+        help = "Flush output at least every SECONDS seconds " \
+            "(default: %s)" % cls.default_flush_interval
+        group.add_option("--flush-interval", dest="flush_interval",
+                         type="float", metavar="SECONDS", help=help)
+    setup_flush_interval_option = classmethod(setup_flush_interval_option)
+
     def setup_options(cls, parser):
         group = parser.add_option_group("Console UI", "Options for console UI")
         cls.setup_color_option(group)
         cls.setup_color_scheme_option(group)
         cls.setup_verbose_option(group)
+        cls.setup_flush_interval_option(group)
     setup_options = classmethod(setup_options)
 
+    default_flush_interval = 0.1
+    default_buffer_size = 8192
+
     def __init__(self, output=sys.stdout, use_color=None, verbose_level=None,
-                 color_scheme=None):
+                 color_scheme=None, flush_interval=None, buffer_size=None):
         if use_color is None:
             use_color = self._detect_color_availability(output)
         self.use_color = use_color
@@ -95,13 +108,30 @@ class ConsoleTestRunner(object):
         self.output = output
         self.color_scheme = pikzie.color.SCHEMES[color_scheme or "default"]
         self.reset_color = pikzie.color.COLORS["reset"]
-
-    def run(self, test, listeners=[]):
+        if flush_interval is None:
+            flush_interval = self.default_flush_interval
+        self.flush_interval = flush_interval
+        if buffer_size is None:
+            buffer_size = self.default_buffer_size
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._buffer_length = 0
+        self._last_flush_time = time.time()
+        self._flush_timer = None
+        self._output_lock = threading.RLock()
+        self._escape_sequences = {}
+        self._reset_sequence = self.reset_color.escape_sequence
+
+    def run(self, test, listeners=[], context=None):
         "Run the given test case or test suite."
-        context = TestRunnerContext()
+        if context is None:
+            context = TestRunnerContext()
         context.add_listener(self)
         context.add_listeners(listeners)
-        test.run(context)
+        try:
+            test.run(context)
+        finally:
+            self._flush()
         return context
 
     def on_start_test_case(self, context, test_case):
@@ -117,6 +147,11 @@ class ConsoleTestRunner(object):
         self._writeln("Finished in %.3f seconds" % context.elapsed)
         self._writeln()
         self._writeln(context.summary(), self._result_color(context))
+        self._writeln("%d pattern cache hit(s), %d pattern cache miss(es)" % \
+                          (context.n_pattern_cache_hits,
+                           context.n_pattern_cache_misses),
+                      level=VERBOSE_LEVEL_VERBOSE)
+        self._flush()
 
     def _generate_test_case_description(self, test_case):
         if not test_case.__doc__:
@@ -158,6 +193,7 @@ class ConsoleTestRunner(object):
     def _on_fault(self, context, fault):
         self._flood_notifications()
         self._write_fault(fault)
+        self._flush()
 
     on_failure = _on_fault
     on_error = _on_fault
@@ -176,6 +212,10 @@ class ConsoleTestRunner(object):
     def on_finish_test(self, context, test):
         self._flood_notifications()
         self._writeln(level=VERBOSE_LEVEL_VERBOSE)
+        for n_attempts, elapsed in getattr(test, "try_call_statistics", ()):
+            self._writeln("    assert_try_call: %d attempt(s) in %.3f seconds" % \
+                              (n_attempts, elapsed),
+                          level=VERBOSE_LEVEL_VERBOSE)
 
     def on_finish_test_case(self, context, test_case):
         self._writeln(level=VERBOSE_LEVEL_VERBOSE)
@@ -200,15 +240,46 @@ class ConsoleTestRunner(object):
     def _fault_color(self, fault):
         return self.color_scheme[fault.__class__.name]
 
+    def _escape_sequence(self, color):
+        escape_sequence = self._escape_sequences.get(color)
+        if escape_sequence is None:
+            escape_sequence = color.escape_sequence
+            self._escape_sequences[color] = escape_sequence
+        return escape_sequence
+
     def _write(self, arg, color=None, level=VERBOSE_LEVEL_NORMAL):
         if self.verbose_level < level:
             return
         if self.use_color and color:
-            arg = "%s%s%s" % (color.escape_sequence,
+            arg = "%s%s%s" % (self._escape_sequence(color),
                               arg,
-                              self.reset_color.escape_sequence)
-        self.output.write(arg)
-        self.output.flush()
+                              self._reset_sequence)
+        with self._output_lock:
+            self._buffer.append(arg)
+            self._buffer_length += len(arg)
+            if self._buffer_length >= self.buffer_size or \
+                    time.time() - self._last_flush_time >= self.flush_interval:
+                self._flush()
+            elif self._flush_timer is None:
+                # Buffered output is flushed by the timer even while a
+                # long running test doesn't write anything.
+                self._flush_timer = threading.Timer(self.flush_interval,
+                                                    self._flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush(self):
+        with self._output_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._last_flush_time = time.time()
+            if not self._buffer:
+                return
+            self.output.write("".join(self._buffer))
+            self._buffer = []
+            self._buffer_length = 0
+            self.output.flush()
 
     def _write_fault(self, fault, level=VERBOSE_LEVEL_NORMAL):
         self._write(fault.symbol, self._fault_color(fault), level)
@@ -254,20 +325,26 @@ class ConsoleTestRunner(object):
             self._writeln(str(detail))
         if hasattr(fault, "expected") and fault.expected and fault.actual:
             self._write("expected: <")
-            self._write(fault.expected, self.color_scheme["success"])
+            self._write(str(fault.expected), self.color_scheme["success"])
             self._writeln(">")
             self._write(" but was: <")
-            self._write(fault.actual, self._fault_color(fault))
+            self._write(str(fault.actual), self._fault_color(fault))
             self._writeln(">")
+            if getattr(fault, "differences", None):
+                # Differences have diffs of different strings in
+                # them. Diff of the whole values isn't needed.
+                self._writeln("differences:")
+                for difference in fault.differences:
+                    self._writeln(difference)
+                return
             formatted_expected = pp.format_for_diff(fault.expected)
             formatted_actual = pp.format_for_diff(fault.actual)
-            diff = pp.format_diff(formatted_expected, formatted_actual)
-            if pp.is_interested_diff(diff):
+            diff, folded_diff = pp.format_diffs(formatted_expected,
+                                                formatted_actual)
+            if diff:
                 self._writeln("diff:")
                 self._writeln(diff)
-            if pp.need_fold(diff):
-                folded_diff = pp.format_folded_diff(formatted_expected,
-                                                    formatted_actual)
+            if folded_diff:
                 self._writeln()
                 self._writeln("folded diff:")
                 self._writeln(folded_diff)
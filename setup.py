@@ -256,12 +256,19 @@ setup(name=package_name,
       license="LGPL",
       package_dir={'': 'lib'},
       packages=["pikzie", "pikzie.ui"],
+      python_requires=">=3.7",
       classifiers=[
         "License :: OSI Approved :: GNU Library or Lesser General Public License (LGPL)",
         "Development Status :: 5 - Production/Stable",
         "Topic :: Software Development :: Testing",
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
         "Natural Language :: Japanese",
         "Natural Language :: English",
         ],
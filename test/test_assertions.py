@@ -1,7 +1,12 @@
 import os
 import re
+import array
+import io
+import concurrent.futures
 import shutil
+import subprocess
 import sys
+import threading
 
 try:
     from exceptions import *
@@ -14,7 +19,10 @@ except ImportError:
     pass
 
 import pikzie
+import pikzie.assertions
+import pikzie.log_watcher
 import pikzie.pretty_print as pp
+import pikzie.utils
 import test.utils
 try:
     import builtins
@@ -23,6 +31,7 @@ except ImportError:
 
 base_path = os.path.dirname(__file__)
 tmp_path = os.path.join(base_path, "tmp")
+tmp_dir = os.path.join(base_path, "tmp-files")
 nonexistent_path = os.path.join(base_path, "nonexistent")
 
 class TestAssertions(pikzie.TestCase, test.utils.Assertions):
@@ -42,8 +51,12 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
     class TestCase(pikzie.TestCase):
         def setup(self):
             shutil.rmtree(tmp_path, True)
+            shutil.rmtree(tmp_dir, True)
             shutil.rmtree(nonexistent_path, True)
 
+        def teardown(self):
+            shutil.rmtree(tmp_dir, True)
+
         def test_fail(self):
             self.fail("Failed!!!")
 
@@ -109,6 +122,25 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
             self.assert_equal(2, 3)
             self.assert_equal(5, 5)
 
+        def test_assert_equal_bytes(self):
+            self.assert_equal_bytes(b"abc", bytearray(b"abc"))
+            self.assert_equal(memoryview(b"abc"), b"abc")
+            expected = bytes(bytearray(range(64)))
+            actual = bytearray(expected)
+            actual[36] = 0
+            self.assert_equal(expected, bytes(actual[:40]))
+
+        def test_assert_equal_memoryview(self):
+            self.assert_equal(memoryview(array.array("d", [0.0])),
+                              memoryview(array.array("d", [-0.0])))
+            self.assert_equal(memoryview(array.array("i", [1])),
+                              memoryview(b"\x01\x00\x00\x00"))
+
+        def test_assert_equal_signed_bytes(self):
+            self.assert_equal(memoryview(array.array("b", [-1])),
+                              memoryview(array.array("b", [-1])))
+            self.assert_equal(memoryview(array.array("b", [-1])), b"\xff")
+
         def test_assert_not_equal(self):
             self.assert_not_equal(2, 3)
             self.assert_not_equal(2, 2)
@@ -134,6 +166,39 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
             self.assert_in_delta(0.5, 0.5001, 0.00001)
             self.assert_in_delta(0.5, 0.5001, 0.000001)
 
+        def test_assert_all_in_delta(self):
+            self.assert_all_in_delta([1, 2, 3], [1.01, 1.99, 3], 0.1)
+            self.assert_all_in_delta(array.array("d", [1, 2, 3]),
+                                     memoryview(array.array("d", [1, 2, 3])),
+                                     0.1)
+            self.assert_all_in_delta([1, 2, 3, 4], [1.5, 2, 3.25, 4.5], 0.1,
+                                     max_offenders=2)
+
+        def test_assert_all_in_delta_shape(self):
+            numbers = memoryview(array.array("d", range(6))).cast("B")
+            self.assert_all_in_delta(numbers.cast("d", [2, 3]), range(6), 0.1)
+            self.assert_all_in_delta(numbers.cast("d", [2, 3]),
+                                     numbers.cast("d", [3, 2]), 0.1)
+
+        class Positive(object):
+            def __call__(self, number):
+                return number > 0
+
+            def __repr__(self):
+                return "positive"
+
+        def test_assert_all(self):
+            positive = self.Positive()
+            self.assert_all(positive, (i + 1 for i in range(10000)))
+            executor = concurrent.futures.ThreadPoolExecutor(2)
+            try:
+                self.assert_all(positive, range(1, 10000), chunk_size=100,
+                                executor=executor)
+                self.assert_all(positive, range(-3, 10000), max_samples=2,
+                                chunk_size=2, executor=executor)
+            finally:
+                executor.shutdown()
+
         def test_assert_match(self):
             self.assert_match("abc", "abcde")
             self.assert_match("abc", "Xabcde")
@@ -240,6 +305,56 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
         def test_assert_run_command_unknown(self):
             self.assert_run_command(["unknown", "arg1", "arg2"])
 
+        def test_assert_run_command_large_output(self):
+            process = self.assert_run_command([sys.executable, "-c",
+                                               "print('x' * 2000000)"])
+            self.assert_equal(2000001, len(process.stdout.read()))
+
+        def test_assert_run_command_timeout(self):
+            self.assert_run_command([sys.executable, "-c",
+                                     "import time; time.sleep(10)"],
+                                    timeout=0.1)
+
+        def test_assert_run_commands(self):
+            processes = self.assert_run_commands([["echo", "1"],
+                                                  ["echo", "2"]])
+            self.assert_equal([b"1\n", b"2\n"],
+                              [process.stdout.read()
+                               for process in processes])
+            self.assert_run_commands(["true",
+                                      ["sh", "-c", "exit 2"],
+                                      ["unknown", "arg1"]],
+                                     max_parallel=2)
+
+        def test_assert_spawn_command(self):
+            command = [sys.executable, "-u", "-c",
+                       "import sys; print('starting'); print('ready'); "
+                       "print(sys.stdin.readline().upper())"]
+            with self.assert_spawn_command(command, "(?m)^ready$") as server:
+                server.send("hello\n")
+                self.assert_not_none(server.expect("HELLO"))
+            self.assert_spawn_command([sys.executable, "-c",
+                                       "import sys; "
+                                       "sys.stderr.write('error\\n'); "
+                                       "sys.exit(3)"],
+                                      "ready")
+
+        def test_assert_spawn_command_timeout(self):
+            self.assert_spawn_command([sys.executable, "-c",
+                                       "import time; time.sleep(10)"],
+                                      "ready", 0.1)
+
+        def test_assert_search_log_call(self):
+            path = self._write_tmp_file("server.log", b"old: find me!\n")
+            def log(message):
+                file = open(path, "a")
+                try:
+                    file.write("%s\n" % message)
+                finally:
+                    file.close()
+            self.assert_search_log_call("find me!+", path, log, "find me!!!")
+            self.assert_search_log_call("fix me!", path, log, "FIXME!!!")
+
         def test_assert_search_syslog_call(self):
             self.assert_search_syslog_call("find me!+",
                                            syslog.syslog, "find me!!!")
@@ -254,6 +369,97 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
             self.assert_not_exists(nonexistent_path)
             self.assert_not_exists(__file__)
 
+        def _write_tmp_file(self, name, content):
+            path = os.path.join(tmp_dir, name)
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            file = open(path, "wb")
+            try:
+                file.write(content)
+            finally:
+                file.close()
+            return path
+
+        def test_assert_file_equal(self):
+            content = b"0123456789\n" * 6
+            expected_path = self._write_tmp_file("expected", content)
+            actual_content = content[:40] + b"X" + content[41:51] + b"X" + \
+                content[52:]
+            actual_path = self._write_tmp_file("actual", actual_content)
+            self.assert_file_equal(expected_path, expected_path)
+            self.assert_file_equal(expected_path, actual_path)
+
+        def test_assert_file_equal_different_size(self):
+            expected_path = self._write_tmp_file("expected", b"abc")
+            actual_path = self._write_tmp_file("actual", b"abcd")
+            self.assert_file_equal(expected_path, actual_path)
+
+        def test_assert_file_equal_nonexistent(self):
+            expected_path = self._write_tmp_file("expected", b"abc")
+            self.assert_file_equal(expected_path, nonexistent_path)
+
+        def test_assert_file_match_digest(self):
+            path = self._write_tmp_file("abc", b"abc")
+            self.assert_file_match_digest("BA7816BF8F01CFEA414140DE5DAE2223"
+                                          "B00361A396177A9CB410FF61F20015AD",
+                                          path)
+            self.assert_file_match_digest("00000000000000000000000000000000",
+                                          path, "md5")
+
+        def test_assert_tree_equal(self):
+            self._write_tmp_file(os.path.join("expected", "a", "1"), b"1")
+            self._write_tmp_file(os.path.join("expected", "a", "2"), b"2")
+            self._write_tmp_file(os.path.join("expected", "b", "3"), b"3")
+            self._write_tmp_file(os.path.join("expected", "c"), b"c")
+            expected_dir = os.path.join(tmp_dir, "expected")
+            actual_dir = os.path.join(tmp_dir, "actual")
+            pikzie.utils.cp_a(expected_dir, actual_dir)
+            self.assert_tree_equal(expected_dir, actual_dir)
+            self.assert_tree_equal(expected_dir, actual_dir, shallow=True)
+            os.remove(os.path.join(actual_dir, "a", "2"))
+            self._write_tmp_file(os.path.join("actual", "b", "3"), b"X")
+            self._write_tmp_file(os.path.join("actual", "c"), b"cc")
+            self._write_tmp_file(os.path.join("actual", "d"), b"d")
+            self.assert_tree_equal(expected_dir, actual_dir, max_paths=1)
+
+        def test_assert_tree_equal_symlink(self):
+            self._write_tmp_file(os.path.join("expected", "a", "1"), b"1")
+            expected_dir = os.path.join(tmp_dir, "expected")
+            actual_dir = os.path.join(tmp_dir, "actual")
+            os.symlink(".", os.path.join(expected_dir, "a", "loop"))
+            os.symlink("nonexistent", os.path.join(expected_dir, "broken"))
+            os.symlink("a", os.path.join(expected_dir, "link"))
+            shutil.copytree(expected_dir, actual_dir, symlinks=True)
+            self.assert_tree_equal(expected_dir, actual_dir)
+            os.remove(os.path.join(actual_dir, "link"))
+            os.symlink(os.path.join("a", "1"), os.path.join(actual_dir, "link"))
+            self.assert_tree_equal(expected_dir, actual_dir)
+
+        def test_assert_tree_equal_nonexistent(self):
+            self._write_tmp_file(os.path.join("expected", "a"), b"a")
+            expected_dir = os.path.join(tmp_dir, "expected")
+            self.assert_tree_equal(expected_dir, nonexistent_path)
+
+        def test_assert_search_file(self):
+            path = self._write_tmp_file("search.log",
+                                        b"first line\n"
+                                        b"second ERROR line\n"
+                                        b"third\n")
+            self.assert_equal((2, b"second ERROR line"),
+                              self.assert_search_file(b"ERROR", path))
+            self.assert_search_file(re.compile("^third$", re.M), path)
+            self.assert_search_file("^fourth", path)
+
+        def test_assert_not_found_file(self):
+            path = self._write_tmp_file("search.log",
+                                        b"first line\n"
+                                        b"second ERROR line\n"
+                                        b"third\n")
+            empty_path = self._write_tmp_file("empty.log", b"")
+            self.assert_not_found_file(b"WARNING", path)
+            self.assert_not_found_file(b"ERROR", empty_path)
+            self.assert_not_found_file("(?m)^second", path)
+
         def test_assert_open_file(self):
             file = self.assert_open_file(__file__)
             self.assert_equal("r", file.mode)
@@ -267,16 +473,56 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
                 self.n += 1
                 self.assert_equal(5, self.n)
             self.assert_try_call(1, 0.01, succeed_on_5th_try)
+            self.assert_equal(5, self.try_call_statistics[0][0])
 
             def never_succeed():
                 self.fail("Never succeed")
             self.assert_try_call(0.1, 0.01, never_succeed)
 
+        def test_assert_try_call_backoff(self):
+            event = threading.Event()
+            self.ready = False
+            def set_ready():
+                self.ready = True
+                event.set()
+            timer = threading.Timer(0.05, set_ready)
+            timer.start()
+            try:
+                backoff = pikzie.Backoff(10, max_interval=10,
+                                         wake_up=[event])
+                self.assert_try_call(5, backoff,
+                                     lambda: self.assert_true(self.ready))
+            finally:
+                timer.cancel()
+            self.assert_equal(2, backoff.n_attempts)
+            self.assert_in_delta(0, backoff.elapsed, 1)
+
+            def never_succeed():
+                self.fail("Never succeed")
+            self.assert_try_call(0.05, pikzie.Backoff(0.01, jitter=0),
+                                 never_succeed)
+
         def test_assert_kernel_symbol(self):
             address = self.assert_kernel_symbol("printk")
             self.assert_not_none(address)
             self.assert_kernel_symbol("nonexistent")
 
+        def test_assert_kernel_symbols(self):
+            path = self._write_tmp_file("kallsyms",
+                                        b"ffffffff81000000 T _stext\n"
+                                        b"ffffffff81001000 T printk\n"
+                                        b"ffffffffc0001000 t ext4_fill_super"
+                                        b"\t[ext4]\n")
+            self.assert_equal("ffffffff81001000",
+                              self.assert_kernel_symbol("printk", path))
+            self.assert_equal(["ffffffff81000000", "ffffffffc0001000"],
+                              self.assert_kernel_symbols(["_stext",
+                                                          "ext4_fill_super"],
+                                                         path))
+            self.assert_kernel_symbols(["printk", "nonexistent1",
+                                        "_stext", "nonexistent2"],
+                                       path)
+
     def test_fail(self):
         """Test for fail"""
         self.assert_result(False, 1, 0, 1, 0, 0, 0, 0,
@@ -372,6 +618,50 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
                              None)],
                            ["test_assert_equal"])
 
+    def test_assert_equal_bytes(self):
+        self.assert_result(False, 1, 2, 1, 0, 0, 0, 0,
+                           [('F',
+                             'TestCase.test_assert_equal_bytes',
+                             "expected: <64 bytes>\n"
+                             " but was: <40 bytes>\n"
+                             "first difference at offset 36 (0x24)\n"
+                             "\n"
+                             "hexdump diff:\n"
+                             "  00000000: 00 01 02 03 04 05 06 07 "
+                             "08 09 0a 0b 0c 0d 0e 0f |................|\n"
+                             "  00000010: 10 11 12 13 14 15 16 17 "
+                             "18 19 1a 1b 1c 1d 1e 1f |................|\n"
+                             "- 00000020: 20 21 22 23 24 25 26 27 "
+                             "28 29 2a 2b 2c 2d 2e 2f | !\"#$%&'()*+,-./|\n"
+                             "+ 00000020: 20 21 22 23 00 25 26 27"
+                             "                         | !\"#.%&'|\n"
+                             "?                       ^^          "
+                             "^^ ^^ ^^ ^^ ^^ ^^ ^^ ^^\n"
+                             "- 00000030: 30 31 32 33 34 35 36 37 "
+                             "38 39 3a 3b 3c 3d 3e 3f |0123456789:;<=>?|\n"
+                             "?           ^^ ^^ ^^ ^^ ^^ ^^ ^^ ^^ "
+                             "^^ ^^ ^^ ^^ ^^ ^^ ^^ ^^",
+                             None)],
+                           ["test_assert_equal_bytes"])
+
+    def test_assert_equal_memoryview(self):
+        self.assert_result(False, 1, 1, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_equal_memoryview",
+                             re.compile("^expected: <<memory at 0x[\\da-f]+>>\n"
+                                        " but was: <<memory at 0x[\\da-f]+>>$"),
+                             None)],
+                           ["test_assert_equal_memoryview"])
+
+    def test_assert_equal_signed_bytes(self):
+        self.assert_result(False, 1, 1, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_equal_signed_bytes",
+                             re.compile("^expected: <<memory at 0x[\\da-f]+>>\n"
+                                        " but was: <b'\\\\xff'>$"),
+                             None)],
+                           ["test_assert_equal_signed_bytes"])
+
     def test_assert_not_equal(self):
         self.assert_result(False, 2, 1, 2, 0, 0, 0, 0,
                            [('F',
@@ -406,6 +696,41 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
                              None)],
                            ["test_assert_in_delta"])
 
+    def test_assert_all_in_delta(self):
+        self.assert_result(False, 1, 2, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_all_in_delta",
+                             "expected: all of <4> items are in delta <0.1>\n"
+                             " but was: <3> items are out of delta\n"
+                             "worst offenders:\n"
+                             "  [0]: <1> != <1.5> (difference: <0.5>)\n"
+                             "  [3]: <4> != <4.5> (difference: <0.5>)",
+                             None)],
+                           ["test_assert_all_in_delta"])
+
+    def test_assert_all_in_delta_shape(self):
+        self.assert_result(False, 1, 1, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_all_in_delta_shape",
+                             "expected: <(2, 3)> shape\n"
+                             " but was: <(3, 2)> shape",
+                             None)],
+                           ["test_assert_all_in_delta_shape"])
+
+    def test_assert_all(self):
+        self.assert_result(False, 1, 2, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_all",
+                             "expected: <positive> returns a true value "
+                             "for all items\n"
+                             " but was: <4> of <10003> items failed\n"
+                             "failed items:\n"
+                             "  [0]: <-3>\n"
+                             "  [1]: <-2>\n"
+                             "  ...",
+                             None)],
+                           ["test_assert_all"])
+
     def test_assert_match(self):
         pattern = re.compile('xyz')
         self.assert_result(False, 2, 2, 2, 0, 0, 0, 0,
@@ -608,6 +933,82 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
                            ["test_assert_run_command",
                             "test_assert_run_command_unknown"])
 
+    def test_assert_run_command_large_output(self):
+        self.assert_result(True, 1, 2, 0, 0, 0, 0, 0, [],
+                           ["test_assert_run_command_large_output"])
+
+    def test_assert_run_command_timeout(self):
+        command = [sys.executable, "-c", "import time; time.sleep(10)"]
+        self.assert_result(False, 1, 0, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_run_command_timeout",
+                             "expected: <%s> is finished in <0.1> seconds\n"
+                             " but was: killed by timeout" % \
+                                 pp.format(command),
+                             None)],
+                           ["test_assert_run_command_timeout"])
+
+    def test_assert_run_commands(self):
+        os_error = None
+        try:
+            subprocess.Popen(["unknown", "arg1"])
+        except OSError as exception:
+            os_error = exception
+        self.assert_result(False, 1, 2, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_run_commands",
+                             "expected: all of <3> commands are "
+                             "successfully finished\n"
+                             " but was: <2> commands failed\n"
+                             "  <['sh', '-c', 'exit 2']>: "
+                             "<2> is returned as exit code\n"
+                             "  <['unknown', 'arg1']>: "
+                             "<%s>(%s) is raised and failed to ran" % \
+                                 (type(os_error), os_error),
+                             None)],
+                           ["test_assert_run_commands"])
+
+    def test_assert_spawn_command(self):
+        command = [sys.executable, "-c",
+                   "import sys; sys.stderr.write('error\\n'); sys.exit(3)"]
+        self.assert_result(False, 1, 2, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_spawn_command",
+                             "expected: </ready/> is found in output of "
+                             "<%s> in <10> seconds\n"
+                             " but was: output is closed with <3> exit code\n"
+                             "  output: <'error\\n'>" % pp.format(command),
+                             None)],
+                           ["test_assert_spawn_command"])
+
+    def test_assert_spawn_command_timeout(self):
+        command = [sys.executable, "-c", "import time; time.sleep(10)"]
+        self.assert_result(False, 1, 0, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_spawn_command_timeout",
+                             "expected: </ready/> is found in output of "
+                             "<%s> in <0.1> seconds\n"
+                             " but was: not found until timeout\n"
+                             "  output: <''>" % pp.format(command),
+                             None)],
+                           ["test_assert_spawn_command_timeout"])
+
+    def test_assert_search_log_call(self):
+        timeout = pikzie.log_watcher.LogWatcher.timeout
+        pikzie.log_watcher.LogWatcher.timeout = 0.1
+        try:
+            self.assert_result(False, 1, 3, 1, 0, 0, 0, 0,
+                               [('F',
+                                 "TestCase.test_assert_search_log_call",
+                                 "expected: </fix me!/> is found in <%s>\n"
+                                 " content: <'FIXME!!!\\n'>" % \
+                                     pp.format(os.path.join(tmp_dir,
+                                                            "server.log")),
+                                 None)],
+                               ["test_assert_search_log_call"])
+        finally:
+            pikzie.log_watcher.LogWatcher.timeout = timeout
+
     def test_assert_search_syslog_call(self):
         if not hasattr(sys.modules[__name__], "syslog"):
             self.omit("syslog isn't supported on this environment")
@@ -641,6 +1042,153 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
                              None)],
                            ["test_assert_not_exists"])
 
+    def test_assert_file_equal(self):
+        expected_path = os.path.join(tmp_dir, "expected")
+        actual_path = os.path.join(tmp_dir, "actual")
+        self.assert_result(False, 2, 1, 2, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_file_equal",
+                             "expected: <%s> and <%s> have the same content\n"
+                             " but was: first difference at offset 40 (0x28), "
+                             "line 4\n"
+                             "\n"
+                             "hexdump diff:\n"
+                             "  00000000: 30 31 32 33 34 35 36 37 "
+                             "38 39 0a 30 31 32 33 34 |0123456789.01234|\n"
+                             "  00000010: 35 36 37 38 39 0a 30 31 "
+                             "32 33 34 35 36 37 38 39 |56789.0123456789|\n"
+                             "- 00000020: 0a 30 31 32 33 34 35 36 "
+                             "37 38 39 0a 30 31 32 33 |.0123456789.0123|\n"
+                             "+ 00000020: 0a 30 31 32 33 34 35 36 "
+                             "58 38 39 0a 30 31 32 33 |.0123456X89.0123|\n"
+                             "?                                   ^^\n"
+                             "- 00000030: 34 35 36 37 38 39 0a 30 "
+                             "31 32 33 34 35 36 37 38 |456789.012345678|\n"
+                             "+ 00000030: 34 35 36 58 38 39 0a 30 "
+                             "31 32 33 34 35 36 37 38 |456X89.012345678|\n"
+                             "?                    ^^\n"
+                             "  00000040: 39 0a"
+                             "                                           "
+                             "|9.|" % (expected_path, actual_path),
+                             None),
+                            ('F',
+                             "TestCase.test_assert_file_equal_different_size",
+                             "expected: <%s> and <%s> have the same content\n"
+                             " but was: they have different sizes: <3> != <4>" % \
+                                 (expected_path, actual_path),
+                             None)],
+                           ["test_assert_file_equal",
+                            "test_assert_file_equal_different_size"])
+
+    def test_assert_file_equal_nonexistent(self):
+        file_not_found_error = getattr(builtins, "FileNotFoundError", IOError)
+        self.assert_result(False, 1, 0, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_file_equal_nonexistent",
+                             "expected: open('%s', 'rb') succeeds\n"
+                             " but was: <%s>(%s) is raised" % \
+                                 (nonexistent_path,
+                                  file_not_found_error,
+                                  "[Errno 2] No such file or directory: '%s'" % \
+                                      nonexistent_path),
+                             None)],
+                           ["test_assert_file_equal_nonexistent"])
+
+    def test_assert_file_match_digest(self):
+        path = os.path.join(tmp_dir, "abc")
+        self.assert_result(False, 1, 1, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_file_match_digest",
+                             "expected: <00000000000000000000000000000000> "
+                             "is md5 digest of <%s>\n"
+                             " but was: <900150983cd24fb0d6963f7d28e17f72>" % \
+                                 path,
+                             None)],
+                           ["test_assert_file_match_digest"])
+
+    def test_assert_tree_equal(self):
+        expected_dir = os.path.join(tmp_dir, "expected")
+        actual_dir = os.path.join(tmp_dir, "actual")
+        self.assert_result(False, 1, 2, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_tree_equal",
+                             "expected: <%s> and <%s> have the same files\n"
+                             " but was:\n"
+                             "missing: <1>\n"
+                             "  %s\n"
+                             "extra: <1>\n"
+                             "  d\n"
+                             "changed: <2>\n"
+                             "  %s\n"
+                             "  ... 1 more" % \
+                                 (expected_dir, actual_dir,
+                                  os.path.join("a", "2"),
+                                  os.path.join("b", "3")),
+                             None)],
+                           ["test_assert_tree_equal"])
+
+    def test_assert_tree_equal_symlink(self):
+        expected_dir = os.path.join(tmp_dir, "expected")
+        actual_dir = os.path.join(tmp_dir, "actual")
+        self.assert_result(False, 1, 1, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_tree_equal_symlink",
+                             "expected: <%s> and <%s> have the same files\n"
+                             " but was:\n"
+                             "missing: <0>\n"
+                             "extra: <0>\n"
+                             "changed: <1>\n"
+                             "  link" % (expected_dir, actual_dir),
+                             None)],
+                           ["test_assert_tree_equal_symlink"])
+
+    def test_assert_tree_equal_nonexistent(self):
+        file_not_found_error = getattr(builtins, "FileNotFoundError", OSError)
+        self.assert_result(False, 1, 0, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_tree_equal_nonexistent",
+                             "expected: <%s> is a readable directory\n"
+                             " but was: <%s>(%s) is raised" % \
+                                 (nonexistent_path,
+                                  file_not_found_error,
+                                  "[Errno 2] No such file or directory: '%s'" % \
+                                      nonexistent_path),
+                             None)],
+                           ["test_assert_tree_equal_nonexistent"])
+
+    def test_assert_search_file(self):
+        path = os.path.join(tmp_dir, "search.log")
+        self.assert_result(False, 1, 3, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_search_file",
+                             "expected: </^fourth/> is found in <%s>\n"
+                             " but was: not found in <35> bytes" % path,
+                             None)],
+                           ["test_assert_search_file"])
+
+    def test_assert_not_found_file(self):
+        path = os.path.join(tmp_dir, "search.log")
+        self.assert_result(False, 1, 2, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_not_found_file",
+                             "expected: </(?m)^second/> isn't found in <%s>\n"
+                             " but was: found at line <2>\n"
+                             " snippet: <'second ERROR line'>" % path,
+                             None)],
+                           ["test_assert_not_found_file"])
+
+    def test_search_file_chunk_boundary(self):
+        content = "x" * 50 + "\nfoo\n" + "y" * 30
+        found = [pikzie.assertions._search_chunks(re.compile("^foo$", re.M),
+                                                  io.StringIO(content).read,
+                                                  "\n", chunk_size, 5)
+                 for chunk_size in range(3, 20)]
+        self.assert_equal([(2, "foo")] * 17, found)
+        self.assert_equal(None,
+                          pikzie.assertions._search_chunks(re.compile("^x"),
+                                                           io.StringIO("ax\nxb").read,
+                                                           "\n", 2, 1))
+
     def test_assert_open_file(self):
         file_not_found_error = getattr(builtins, "FileNotFoundError", IOError)
         self.assert_result(False, 1, 4, 1, 0, 0, 0, 0,
@@ -656,18 +1204,38 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
                            ["test_assert_open_file"])
 
     def test_try_call(self):
-        self.assert_result(False, 1, 2, 1, 0, 0, 0, 0,
+        self.assert_result(False, 1, 3, 1, 0, 0, 0, 0,
                            [('F',
                              "TestCase.test_assert_try_call",
-                             "expected: %s succeeds\n"
-                             " timeout: <0.1> seconds\n"
-                             "interval: <0.01> seconds\n"
-                             " but was:\n"
-                             "Never succeed" % \
-                                 ("test_assertions.never_succeed()",),
+                             re.compile(re.escape(
+                                 "expected: %s succeeds\n"
+                                 " timeout: <0.1> seconds\n"
+                                 "interval: <0.01> seconds\n"
+                                 "attempts: <" % \
+                                     ("test_assertions.never_succeed()",)) +
+                                        "\\d+> in <\\d+\\.\\d{3}> seconds\n" +
+                                        re.escape(" but was:\n"
+                                                  "Never succeed")),
                              None)],
                            ["test_assert_try_call"])
 
+    def test_try_call_backoff(self):
+        self.assert_result(False, 1, 4, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_try_call_backoff",
+                             re.compile(re.escape(
+                                 "expected: %s succeeds\n"
+                                 " timeout: <0.05> seconds\n"
+                                 "interval: <Backoff(initial=0.01, factor=2, "
+                                 "max_interval=1, jitter=0)>\n"
+                                 "attempts: <" % \
+                                     ("test_assertions.never_succeed()",)) +
+                                        "\\d+> in <\\d+\\.\\d{3}> seconds\n" +
+                                        re.escape(" but was:\n"
+                                                  "Never succeed")),
+                             None)],
+                           ["test_assert_try_call_backoff"])
+
     def test_kernel_symbol(self):
         if not hasattr(os, "uname"):
             self.omit("only for Linux environment")
@@ -675,9 +1243,42 @@ class TestAssertions(pikzie.TestCase, test.utils.Assertions):
             self.omit("only for Linux environment")
         if not os.path.exists("/proc/kallsyms"):
             self.omit("require /proc/kallsyms")
-        self.assert_result(False, 1, 4, 1, 0, 0, 0, 0,
+        self.assert_result(False, 1, 2, 1, 0, 0, 0, 0,
                            [('F',
                              "TestCase.test_assert_kernel_symbol",
                              "expected: <'nonexistent'> is in kernel symbols",
                              None)],
                            ["test_assert_kernel_symbol"])
+
+    def test_assert_kernel_symbols(self):
+        self.assert_result(False, 1, 4, 1, 0, 0, 0, 0,
+                           [('F',
+                             "TestCase.test_assert_kernel_symbols",
+                             "expected: <['printk', 'nonexistent1', "
+                             "'_stext', 'nonexistent2']> "
+                             "are in kernel symbols\n"
+                             " missing: <['nonexistent1', 'nonexistent2']>",
+                             None)],
+                           ["test_assert_kernel_symbols"])
+
+    def test_kernel_symbols_cache(self):
+        if not os.path.exists(tmp_dir):
+            os.makedirs(tmp_dir)
+        path = os.path.join(tmp_dir, "kallsyms")
+        def write(content):
+            file = open(path, "w")
+            try:
+                file.write(content)
+            finally:
+                file.close()
+        try:
+            write("ffffffff81001000 T printk\n")
+            symbols = pikzie.assertions._load_kernel_symbols(path)
+            cached = symbols is pikzie.assertions._load_kernel_symbols(path)
+            write("ffffffff81001000 T printk\nffffffff81002000 T kmalloc\n")
+            reloaded_symbols = pikzie.assertions._load_kernel_symbols(path)
+        finally:
+            shutil.rmtree(tmp_dir, True)
+        self.assert_equal((True, {"printk": "ffffffff81001000",
+                                  "kmalloc": "ffffffff81002000"}),
+                          (cached, reloaded_symbols))
@@ -0,0 +1,138 @@
+import time
+import types
+import asyncio
+from io import StringIO
+
+import pikzie
+from pikzie.core import TestCaseRunner
+import pikzie.module_base
+from pikzie.ui.console import ConsoleTestRunner
+
+async_module_source = """
+import asyncio
+from pikzie.module_base import assert_equal
+
+async def test_success():
+    await asyncio.sleep(0)
+    assert_equal(3, 1 + 2)
+
+async def test_failure():
+    await asyncio.sleep(0)
+    assert_equal(3, 1 + 1)
+"""
+
+class TestAsync(pikzie.TestCase):
+    """Tests for async tests."""
+
+    class TestCase(pikzie.TestCase):
+        async def setup(self):
+            await asyncio.sleep(0)
+            self.setup_called = True
+
+        async def teardown(self):
+            await asyncio.sleep(0)
+
+        async def test_success(self):
+            await asyncio.sleep(0)
+            self.assert_true(self.setup_called)
+
+        async def test_failure(self):
+            await asyncio.sleep(0)
+            self.assert_equal(3, 1 + 1)
+
+        async def test_pending(self):
+            await asyncio.sleep(0)
+            self.pend("just a minute!")
+
+        async def test_error(self):
+            await asyncio.sleep(0)
+            self.unknown_method()
+
+        def test_sync(self):
+            self.assert_true(self.setup_called)
+
+    class SleepTestCase(pikzie.TestCase):
+        n_running_tests = 0
+        max_n_running_tests = 0
+
+        async def _sleep(self):
+            cls = self.__class__
+            cls.n_running_tests += 1
+            cls.max_n_running_tests = max(cls.max_n_running_tests,
+                                          cls.n_running_tests)
+            await asyncio.sleep(0.2)
+            cls.n_running_tests -= 1
+            self.assert_true(True)
+
+        async def test_sleep1(self):
+            await self._sleep()
+
+        async def test_sleep2(self):
+            await self._sleep()
+
+        async def test_sleep3(self):
+            await self._sleep()
+
+        async def test_sleep4(self):
+            await self._sleep()
+
+    def setup(self):
+        self.runner = ConsoleTestRunner(StringIO(), use_color=False)
+        self.SleepTestCase.max_n_running_tests = 0
+
+    def _runner(self, test_case):
+        tests = [test for test in test_case.collect_test()
+                 if test.short_name().startswith("test_")]
+        return TestCaseRunner(test_case, tests, False)
+
+    def _summarize(self, context):
+        faults = sorted([(fault.symbol, str(fault.test))
+                         for fault in context.faults])
+        return ((context.n_tests, context.n_assertions, context.n_failures,
+                 context.n_errors, context.n_pendings),
+                faults)
+
+    def test_sequential(self):
+        context = self.runner.run(pikzie.TestSuite([self._runner(self.TestCase)]))
+        self.assert_equal(((5, 2, 1, 1, 1),
+                           [("E", "TestCase.test_error"),
+                            ("F", "TestCase.test_failure"),
+                            ("P", "TestCase.test_pending")]),
+                          self._summarize(context))
+
+    def test_async_suite(self):
+        context = self.runner.run(
+            pikzie.AsyncTestSuite([self._runner(self.TestCase)], 2))
+        self.assert_equal(((5, 2, 1, 1, 1),
+                           [("E", "TestCase.test_error"),
+                            ("F", "TestCase.test_failure"),
+                            ("P", "TestCase.test_pending")]),
+                          self._summarize(context))
+
+    def test_failure_traceback(self):
+        context = self.runner.run(pikzie.TestSuite([self._runner(self.TestCase)]))
+        failure = [fault for fault in context.faults
+                   if fault.symbol == "F"][0]
+        self.assert_equal([("test_failure", __file__)],
+                          [(entry.name, entry.file_name)
+                           for entry in failure.traceback])
+
+    def test_concurrency(self):
+        before = time.time()
+        context = self.runner.run(
+            pikzie.AsyncTestSuite([self._runner(self.SleepTestCase)], 2))
+        elapsed = time.time() - before
+        self.assert_equal((4, 2), (context.n_assertions,
+                                   self.SleepTestCase.max_n_running_tests))
+        self.assert_in_delta(0.4, elapsed, 0.15)
+
+    def test_module_based(self):
+        module = types.ModuleType("async_module")
+        exec(async_module_source, module.__dict__)
+        test_case = type(module.__name__, (pikzie.module_base.ModuleBasedTestCase,),
+                         {"target_module": module})
+        context = self.runner.run(
+            pikzie.AsyncTestSuite([self._runner(test_case)], 2))
+        self.assert_equal(((2, 1, 1, 0, 0),
+                           [("F", "async_module.test_failure")]),
+                          self._summarize(context))
@@ -0,0 +1,74 @@
+import os
+import time
+import threading
+
+import pikzie
+from pikzie.utils import *
+
+tmp_dir = os.path.join(os.path.dirname(__file__), "tmp-backoff")
+
+class TestBackoff(pikzie.TestCase):
+    def setup(self):
+        rm_rf(tmp_dir)
+        mkdir_p(tmp_dir)
+
+    def teardown(self):
+        rm_rf(tmp_dir)
+
+    def test_interval(self):
+        backoff = pikzie.Backoff(0.01, 2, 0.05, 0)
+        self.assert_equal([0.01, 0.02, 0.04, 0.05, 0.05],
+                          [backoff.interval(n) for n in range(5)])
+
+    def test_interval_jitter(self):
+        backoff = pikzie.Backoff(1, 2, 3, 0.5)
+        intervals = [backoff.interval(n) for n in range(100)]
+        self.assert_equal((True, True),
+                          (min(intervals) >= 0.5, max(intervals) <= 3))
+
+    def test_wait_timeout(self):
+        backoff = pikzie.Backoff()
+        backoff.start()
+        self.assert_false(backoff.wait(0.01))
+
+    def test_wait_event(self):
+        event = threading.Event()
+        backoff = pikzie.Backoff(wake_up=[event])
+        backoff.start()
+        event.set()
+        self.assert_equal((True, True, False),
+                          (backoff.wait(10), event.is_set(),
+                           backoff.wait(0.05)))
+        event.clear()
+        timer = threading.Timer(0.01, event.set)
+        timer.start()
+        try:
+            self.assert_true(backoff.wait(10))
+        finally:
+            timer.cancel()
+
+    def test_wait_fd(self):
+        read_fd, write_fd = os.pipe()
+        try:
+            backoff = pikzie.Backoff(wake_up=[read_fd])
+            backoff.start()
+            os.write(write_fd, b"x")
+            self.assert_true(backoff.wait(10))
+            before = time.time()
+            for i in range(5):
+                backoff.wait(10)
+            self.assert_true(time.time() - before >= 5 * backoff.min_fd_interval)
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def test_wait_file(self):
+        path = os.path.join(tmp_dir, "ready")
+        backoff = pikzie.Backoff(wake_up=[path])
+        backoff.start()
+        timer = threading.Timer(0.01, lambda: open(path, "w").close())
+        timer.start()
+        try:
+            self.assert_true(backoff.wait(10))
+        finally:
+            timer.cancel()
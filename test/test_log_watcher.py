@@ -0,0 +1,97 @@
+import os
+
+import pikzie
+from pikzie.utils import *
+from pikzie.log_watcher import LogWatcher
+
+tmp_dir = os.path.join(os.path.dirname(__file__), "tmp-log-watcher")
+
+class TestLogWatcher(pikzie.TestCase):
+    def setup(self):
+        rm_rf(tmp_dir)
+        mkdir_p(tmp_dir)
+        self.path = os.path.join(tmp_dir, "log")
+        self.watcher = LogWatcher(self.path, timeout=0, interval=0)
+
+    def teardown(self):
+        self.watcher.close()
+        rm_rf(tmp_dir)
+
+    def write(self, content, mode="a"):
+        log = open(self.path, mode)
+        try:
+            log.write(content)
+        finally:
+            log.close()
+
+    def test_skip_existing_content(self):
+        self.write("old\n")
+        self.watcher.start()
+        self.write("new\n")
+        self.assert_equal(("new\n", None),
+                          (self.watcher.read(), self.watcher.search("old")))
+
+    def test_search_consume(self):
+        self.watcher.start()
+        self.write("first\nsecond\n")
+        self.assert_equal(("first", "second", None),
+                          (self.watcher.search("\\w+").group(),
+                           self.watcher.search("\\w+").group(),
+                           self.watcher.search("\\w+")))
+
+    def test_search_consume_line(self):
+        self.watcher.start()
+        self.write("XERROR\nERROR\n")
+        self.assert_equal(("X", "ERROR\n", 0, ""),
+                          (self.watcher.search("X").group(),
+                           self.watcher.content,
+                           self.watcher.search("^ERROR").start(),
+                           self.watcher.content))
+
+    def test_search_complete_lines(self):
+        self.watcher.start()
+        self.write("ERROR")
+        not_found = self.watcher.search("ERROR$")
+        self.write("S\nERROR\n")
+        self.assert_equal((None, 7),
+                          (not_found,
+                           self.watcher.search("(?m)^ERROR$").start()))
+
+    def test_created(self):
+        self.watcher.start()
+        self.write("created\n")
+        self.assert_not_none(self.watcher.search("created"))
+
+    def test_rotated(self):
+        self.write("old\n")
+        self.watcher.start()
+        os.rename(self.path, self.path + ".1")
+        self.write("new\n")
+        self.assert_equal("new\n", self.watcher.read())
+
+    def test_truncated(self):
+        self.write("long old content\n")
+        self.watcher.start()
+        self.write("new\n", "w")
+        self.assert_equal("new\n", self.watcher.read())
+
+    def test_slide_window(self):
+        self.watcher.window_size = 8
+        self.watcher.start()
+        self.write("first\nsecond\nthird\n")
+        self.watcher.read()
+        self.write("0123456789")
+        self.watcher.read()
+        self.assert_equal("23456789", self.watcher.content)
+
+    def test_slide_window_by_line(self):
+        self.watcher.window_size = 8
+        self.watcher.start()
+        self.write("first\nsecond\nthird\n")
+        self.watcher.read()
+        self.assert_equal("third\n", self.watcher.content)
+
+    def test_search_burst(self):
+        self.watcher.start()
+        self.write("NEEDLE line\n" + "other line\n" * 20000)
+        self.assert_not_none(self.watcher.search("NEEDLE"))
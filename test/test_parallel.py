@@ -0,0 +1,90 @@
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import pikzie
+from pikzie.ui.console import ConsoleTestRunner
+
+class TestParallel(pikzie.TestCase):
+    """Tests for running tests in parallel."""
+
+    class TestCase1(pikzie.TestCase):
+        def test_success(self):
+            self.assert_equal(3, 1 + 2)
+            self.assert_equal(5, 2 + 3)
+
+        def test_failure(self):
+            self.assert_equal(3, 1 + 1)
+
+        def test_notification(self):
+            self.notify("Call me!")
+            self.assert_true(True)
+
+    class TestCase2(pikzie.TestCase):
+        def test_error(self):
+            self.unknown_method()
+
+        def test_pending(self):
+            self.pend("just a minute!")
+
+        def test_omission(self):
+            self.omit("not supported")
+
+    def setup(self):
+        self.output = StringIO()
+        self.runner = ConsoleTestRunner(self.output, use_color=False)
+
+    def _runners(self):
+        runners = []
+        for test_case in [self.TestCase1, self.TestCase2]:
+            tests = [test for test in test_case.collect_test()
+                     if test.short_name().startswith("test_")]
+            runners.append(pikzie.core.TestCaseRunner(test_case, tests, False))
+        return runners
+
+    def _summarize(self, context):
+        faults = sorted([(fault.symbol, str(fault.test))
+                         for fault in context.faults])
+        return ((context.n_tests, context.n_assertions, context.n_failures,
+                 context.n_errors, context.n_pendings, context.n_omissions,
+                 context.n_notifications),
+                faults)
+
+    def test_process_pool(self):
+        runners = self._runners()
+        suite = pikzie.ProcessPoolTestSuite(runners, 2)
+        context = self.runner.run(suite)
+        self.assert_equal(((6, 3, 1, 1, 1, 1, 1),
+                           [("E", "TestCase2.test_error"),
+                            ("F", "TestCase1.test_failure"),
+                            ("N", "TestCase1.test_notification"),
+                            ("O", "TestCase2.test_omission"),
+                            ("P", "TestCase2.test_pending")]),
+                          self._summarize(context))
+        tests = []
+        for runner in runners:
+            tests.extend(runner.tests())
+        for result in context.results:
+            self.assert_true(result.test in tests)
+
+    def test_process_pool_same_as_sequential(self):
+        sequential_context = ConsoleTestRunner(StringIO(), use_color=False).run(
+            pikzie.TestSuite(self._runners()))
+        parallel_context = self.runner.run(
+            pikzie.ProcessPoolTestSuite(self._runners(), 2))
+        self.assert_equal(self._summarize(sequential_context),
+                          self._summarize(parallel_context))
+
+    def test_thread_pool(self):
+        runners = self._runners()
+        suite = pikzie.ThreadPoolTestSuite(runners, 2)
+        context = self.runner.run(suite)
+        self.assert_equal(((6, 3, 1, 1, 1, 1, 1),
+                           [("E", "TestCase2.test_error"),
+                            ("F", "TestCase1.test_failure"),
+                            ("N", "TestCase1.test_notification"),
+                            ("O", "TestCase2.test_omission"),
+                            ("P", "TestCase2.test_pending")]),
+                          self._summarize(context))
+        self.assert_equal([], list(context._start_times))
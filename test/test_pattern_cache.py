@@ -0,0 +1,51 @@
+import re
+
+import pikzie
+from pikzie.pattern_cache import PatternCache
+
+class TestPatternCache(pikzie.TestCase):
+    """Tests for compiled pattern cache."""
+
+    def test_compile(self):
+        cache = PatternCache(2)
+        abc = cache.compile("abc")
+        self.assert_equal((True, "abc", (0, 1)),
+                          (abc is cache.compile("abc"), abc.pattern,
+                           (cache.n_misses - 1, cache.n_hits)))
+
+    def test_compile_flags(self):
+        cache = PatternCache()
+        self.assert_equal((0, re.IGNORECASE),
+                          (cache.compile("abc").flags & re.IGNORECASE,
+                           cache.compile("abc", re.IGNORECASE).flags & \
+                               re.IGNORECASE))
+
+    def test_compile_compiled_pattern(self):
+        cache = PatternCache()
+        pattern = re.compile("abc")
+        self.assert_equal((True, 0, 0),
+                          (pattern is cache.compile(pattern),
+                           cache.n_hits, cache.n_misses))
+
+    def test_evict_least_recently_used(self):
+        cache = PatternCache(2)
+        cache.compile("a")
+        cache.compile("b")
+        cache.compile("a")
+        cache.compile("c")
+        n_misses = cache.n_misses
+        cache.compile("a")
+        a_missed = cache.n_misses > n_misses
+        cache.compile("b")
+        b_missed = cache.n_misses > n_misses
+        self.assert_equal((2, False, True), (len(cache), a_missed, b_missed))
+
+    def test_context_statistics(self):
+        context = pikzie.TestRunnerContext()
+        pattern = "pattern cache statistics %d" % id(self)
+        PatternCache.default().compile(pattern)
+        PatternCache.default().compile(pattern)
+        context.add_pattern_cache_statistics(3, 4)
+        self.assert_equal((4, 5),
+                          (context.n_pattern_cache_hits,
+                           context.n_pattern_cache_misses))
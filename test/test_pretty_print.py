@@ -0,0 +1,147 @@
+import collections
+
+import pikzie
+import pikzie.pretty_print as pp
+
+class TestPrettyPrint(pikzie.TestCase):
+    """Tests for pretty print."""
+
+    def setup(self):
+        self.diff_time_budget = pp.diff_time_budget
+        self.format_max_items = pp.format_max_items
+        self.format_max_length = pp.format_max_length
+
+    def teardown(self):
+        pp.diff_time_budget = self.diff_time_budget
+        pp.format_max_items = self.format_max_items
+        pp.format_max_length = self.format_max_length
+
+    def _lines(self, n_lines):
+        return "".join(["line %d\n" % i for i in range(n_lines)])
+
+    def test_format_max_items(self):
+        pp.format_max_items = 5
+        formatted = (pp.format(list(range(10))),
+                     pp.format({"a": 1, "b": [1, 2, 3], "c": 2, "d": 3}),
+                     pp.format([list(range(2000)), []]))
+        pp.format_max_items = self.format_max_items
+        self.assert_equal(("[0, 1, 2, 3, 4, ... 5 more items]",
+                           "{'a': 1, 'b': [1, 2, 3], ... 2 more items: ...}",
+                           "[[0, 1, 2, 3, ... 1,996 more items], "
+                           "... 1 more items]"),
+                          formatted)
+
+    def test_format_max_length(self):
+        truncated = repr(pp._Snapshot(10, 5).copy("abcdefgh"))
+        pp.format_max_length = 5
+        formatted = pp.format([12345, 67])
+        pp.format_max_length = self.format_max_length
+        self.assert_equal(("'abcde' ... 3 more characters",
+                           "[1234\n... 6 more characters"),
+                          (truncated, formatted))
+
+    def test_lazy_format(self):
+        items = [1, 2, 3]
+        formatted = pp.LazyFormat(items)
+        items.append(4)
+        self.assert_equal(("[1, 2, 3]", "[1, 2, 3]"),
+                          (str(formatted), pp.format_for_diff(formatted)))
+
+    def test_lazy_format_other_objects(self):
+        items = collections.deque([1, 2])
+        mapping = collections.OrderedDict([("a", 1)])
+        formatted = pp.LazyFormat([items, mapping])
+        items.clear()
+        mapping.clear()
+        self.assert_equal("[deque([1, 2]), OrderedDict({'a': 1})]",
+                          str(formatted))
+
+    def test_format_diff_small(self):
+        self.assert_equal("  a\n"
+                          "- b\n"
+                          "+ c",
+                          pp.format_diff("a\nb", "a\nc"))
+
+    def test_format_diff_large(self):
+        expected = self._lines(10000)
+        actual = expected.replace("line 1042\n", "line X\n")
+        actual = actual.replace("line 5000\n", "")
+        self.assert_equal("@@ -1040,7 +1040,7 @@\n"
+                          "  line 1039\n"
+                          "  line 1040\n"
+                          "  line 1041\n"
+                          "- line 1042\n"
+                          "+ line X\n"
+                          "  line 1043\n"
+                          "  line 1044\n"
+                          "  line 1045\n"
+                          "@@ -4998,7 +4998,6 @@\n"
+                          "  line 4997\n"
+                          "  line 4998\n"
+                          "  line 4999\n"
+                          "- line 5000\n"
+                          "  line 5001\n"
+                          "  line 5002\n"
+                          "  line 5003",
+                          pp.format_diff(expected, actual))
+
+    def test_format_diff_large_context_lines(self):
+        expected = self._lines(1000)
+        actual = expected.replace("line 500\n", "").replace("line 503\n", "")
+        self.assert_equal("@@ -500,6 +500,4 @@\n"
+                          "  line 499\n"
+                          "- line 500\n"
+                          "  line 501\n"
+                          "  line 502\n"
+                          "- line 503\n"
+                          "  line 504",
+                          pp.format_diff(expected, actual, context_lines=1))
+
+    def test_format_diff_over_budget(self):
+        pp.diff_time_budget = -1
+        expected = self._lines(1000)
+        actual = expected.replace("line 500\n", "line X\n")
+        self.assert_equal("diff is too large: first difference at line 501\n"
+                          "- line 500\n"
+                          "+ line X",
+                          pp.format_diff(expected, actual))
+
+    def test_diff_lines_is_minimal(self):
+        lines1 = ["a\n", "b\n", "c\n", "a\n", "b\n", "b\n", "a\n"]
+        lines2 = ["c\n", "b\n", "a\n", "b\n", "a\n", "c\n"]
+        operations = pp._diff_lines(lines1, lines2, float("inf"))
+        n_edits = sum([n_lines for operation, n_lines in operations
+                       if operation != "="])
+        self.assert_equal(5, n_edits)
+
+    def test_structural_diff(self):
+        class Item(object):
+            def __init__(self, price):
+                self.price = price
+            def __eq__(self, other):
+                return vars(self) == vars(other)
+
+        expected = [0, 1, 2, {"items": [Item(i) for i in range(2000)]}]
+        actual = [0, 1, 2, {"items": [Item(i) for i in range(2000)],
+                            "count": 2000},
+                  4]
+        actual[3]["items"][1042].price = 11
+        self.assert_equal((["[3]['items'][1042].price: 1042 != 11",
+                            "[3]['count']: <missing> != 2000",
+                            "[4]: <missing> != 4"],
+                           ["[3]['items'][1042].price: 1042 != 11", "..."],
+                           None),
+                          (pp.structural_diff(expected, actual),
+                           pp.structural_diff(expected, actual, 1),
+                           pp.structural_diff(1, 2)))
+
+    def test_structural_diff_string(self):
+        self.assert_equal(["['a']: 'hello world' != 'hello wurld'\n"
+                           "  diff:\n"
+                           "    - 'hello world'\n"
+                           "    ?         ^\n"
+                           "    + 'hello wurld'\n"
+                           "    ?         ^",
+                           "['b']: 1 != 2"],
+                          pp.structural_diff({"a": "hello world", "b": 1},
+                                             {"a": "hello wurld", "b": 2}))
@@ -0,0 +1,104 @@
+import sys
+import time
+import threading
+
+import pikzie
+from pikzie.process import CommandRunner, SpawnedProcess
+
+class TestCommandRunner(pikzie.TestCase):
+    def test_spill(self):
+        runner = CommandRunner([sys.executable, "-c",
+                                "import sys; "
+                                "sys.stdout.write('o' * 1000); "
+                                "sys.stderr.write('e' * 10)"],
+                               spool_size=100)
+        return_code = runner.run()
+        self.assert_equal((0, True, False, b"o" * 1000, b"e" * 10),
+                          (return_code,
+                           runner.process.stdout._rolled,
+                           runner.process.stderr._rolled,
+                           runner.process.stdout.read(),
+                           runner.process.stderr.read()))
+
+    def test_timeout(self):
+        runner = CommandRunner([sys.executable, "-c",
+                                "import time; print('start', flush=True); "
+                                "time.sleep(10)"],
+                               timeout=0.1)
+        return_code = runner.run()
+        self.assert_equal((True, b"start\n"),
+                          (runner.timed_out, runner.process.stdout.read()))
+        self.assert_not_equal(0, return_code)
+
+    def test_background(self):
+        runner = CommandRunner([sys.executable, "-c",
+                                "import subprocess, sys; "
+                                "subprocess.Popen([sys.executable, '-c', "
+                                "'import time; time.sleep(3)']); "
+                                "print('started')"])
+        before = time.time()
+        return_code = runner.run()
+        elapsed = time.time() - before
+        self.assert_equal((0, b"started\n", True, ["stdout", "stderr"]),
+                          (return_code, runner.process.stdout.read(),
+                           elapsed < 1, runner.truncated_outputs))
+
+    def test_large_output(self):
+        runner = CommandRunner([sys.executable, "-c",
+                                "import sys; "
+                                "sys.stdout.write('x' * (3 * 1024 * 1024))"])
+        return_code = runner.run()
+        self.assert_equal((0, 3 * 1024 * 1024, []),
+                          (return_code, len(runner.process.stdout.read()),
+                           runner.truncated_outputs))
+
+    def test_text(self):
+        runner = CommandRunner([sys.executable, "-c",
+                                "import sys; "
+                                "sys.stdout.buffer.write(b'a\\r\\nb')"],
+                               text=True)
+        runner.run()
+        self.assert_equal("a\nb", runner.process.stdout.read())
+
+class TestSpawnedProcess(pikzie.TestCase):
+    def test_expect_consume(self):
+        spawned = SpawnedProcess([sys.executable, "-c",
+                                  "print('a1 a2 a3')"])
+        with spawned:
+            self.assert_equal(("a1", "a2", "a3", None),
+                              (spawned.expect("a\\d").group(),
+                               spawned.expect("a\\d").group(),
+                               spawned.expect("a\\d").group(),
+                               spawned.expect("a\\d", 1)))
+
+    def test_expect_line_start(self):
+        spawned = SpawnedProcess([sys.executable, "-c",
+                                  "print('Ready'); print('OK')"])
+        with spawned:
+            self.assert_equal(("Ready", None, "OK"),
+                              (spawned.expect("(?m)^Ready").group(),
+                               spawned.expect("^OK", 1),
+                               spawned.expect("(?m)^OK").group()))
+
+    def test_slide_window(self):
+        spawned = SpawnedProcess([sys.executable, "-c",
+                                  "print('x' * 100 + 'end')"],
+                                 encoding=None, window_size=10)
+        with spawned:
+            while not spawned.is_eof():
+                time.sleep(0.01)
+            self.assert_equal(b"xxxxxx" b"end\n", spawned.content)
+
+    def test_expect_burst(self):
+        spawned = SpawnedProcess([sys.executable, "-c",
+                                  "input(); "
+                                  "print('ready'); "
+                                  "print('x' * 100000)"],
+                                 window_size=100)
+        with spawned:
+            timer = threading.Timer(0.1, spawned.send, ["go\n"])
+            timer.start()
+            try:
+                self.assert_not_none(spawned.expect("ready", 5))
+            finally:
+                timer.cancel()
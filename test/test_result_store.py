@@ -0,0 +1,100 @@
+import os
+import json
+from io import StringIO
+
+import pikzie
+from pikzie.utils import *
+from pikzie.result_store import ResultStore
+from pikzie.ui.console import ConsoleTestRunner
+
+tmp_dir = os.path.join(os.path.dirname(__file__), "tmp-result-store")
+
+class TestResultStore(pikzie.TestCase):
+    def setup(self):
+        rm_rf(tmp_dir)
+        mkdir_p(tmp_dir)
+
+    def teardown(self):
+        rm_rf(tmp_dir)
+
+    def read_entries(self):
+        log = open(os.path.join(tmp_dir, ResultStore.file_name))
+        try:
+            return [json.loads(line) for line in log]
+        finally:
+            log.close()
+
+    def test_set_passed(self):
+        store = ResultStore(tmp_dir)
+        self.assert_false(store.is_passed("TestXXX", "test_one"))
+        store.set_passed("TestXXX", "test_one", True)
+        self.assert_true(store.is_passed("TestXXX", "test_one"))
+        store.set_passed("TestXXX", "test_one", False)
+        self.assert_false(store.is_passed("TestXXX", "test_one"))
+
+    def test_flush(self):
+        store = ResultStore(tmp_dir)
+        store.set_passed("TestXXX", "test_one", True)
+        store.set_passed("TestXXX", "test_two", True)
+        store.set_passed("TestXXX", "test_two", False)
+        store.set_passed("TestXXX", "test_one", True)
+        self.assert_not_exists(store.path)
+        store.flush()
+        self.assert_equal([["TestXXX", "test_one", True],
+                           ["TestXXX", "test_two", True],
+                           ["TestXXX", "test_two", False]],
+                          self.read_entries())
+
+        store = ResultStore(tmp_dir)
+        self.assert_equal((True, False),
+                          (store.is_passed("TestXXX", "test_one"),
+                           store.is_passed("TestXXX", "test_two")))
+
+    def test_compact(self):
+        store = ResultStore(tmp_dir)
+        store.batch_size = 2
+        for i in range(3):
+            store.set_passed("TestXXX", "test_one", True)
+            store.set_passed("TestXXX", "test_one", False)
+        store.set_passed("TestXXX", "test_two", True)
+        store.flush()
+        self.assert_equal(7, len(self.read_entries()))
+
+        store = ResultStore(tmp_dir)
+        store.batch_size = 2
+        self.assert_true(store.is_passed("TestXXX", "test_two"))
+        self.assert_equal([["TestXXX", "test_two", True]],
+                          self.read_entries())
+
+    def test_migrate(self):
+        test_dir = os.path.join(tmp_dir, "test_xxx.TestXXX", "test_one")
+        mkdir_p(test_dir)
+        open(os.path.join(test_dir, "passed"), "w").close()
+        mkdir_p(os.path.join(tmp_dir, "test_xxx.TestXXX", "test_two"))
+
+        store = ResultStore(tmp_dir)
+        self.assert_true(store.is_passed("test_xxx.TestXXX", "test_one"))
+        self.assert_false(store.is_passed("test_xxx.TestXXX", "test_two"))
+        self.assert_not_exists(os.path.join(tmp_dir, "test_xxx.TestXXX"))
+        self.assert_equal([["test_xxx.TestXXX", "test_one", True]],
+                          self.read_entries())
+
+    def test_run_tests(self):
+        store = ResultStore(tmp_dir)
+        class TestCase(pikzie.TestCase):
+            def _result_store(self):
+                return store
+
+            def test_success(self):
+                pass
+
+            def test_failure(self):
+                self.fail("failed")
+
+        runner = ConsoleTestRunner(StringIO(), use_color=False)
+        for i in range(2):
+            runner.run(pikzie.TestSuite([TestCase("test_success"),
+                                         TestCase("test_failure")]))
+        store.flush()
+        self.assert_equal([["test_success", True]],
+                          [entry[1:] for entry in self.read_entries()])
@@ -1,4 +1,5 @@
 import re
+import time
 
 try:
     from exceptions import *
@@ -168,6 +169,29 @@ class TestRunner(pikzie.TestCase, Assertions):
         details = format % (self.file_name, line_no, target_line)
         self.assert_output("N.", 1, 2, 0, 0, 0, 0, 1, details, [test])
 
+    def test_deduplicate_notifications(self):
+        class TestCase(pikzie.TestCase):
+            def test_notify_in_loop(self):
+                for i in range(3):
+                    self.notify("Loop!")
+                self.notify("Loop!")
+
+        for deduplicate, n_notifications in [(False, 4), (True, 2)]:
+            test = TestCase("test_notify_in_loop")
+            context = pikzie.TestRunnerContext(deduplicate)
+            self.runner.run(test, [], context)
+            self.assert_equal(n_notifications, context.n_notifications)
+        self.assert_equal(["Notification: "
+                           "TestCase.test_notify_in_loop: Loop! (3 times)",
+                           "Notification: "
+                           "TestCase.test_notify_in_loop: Loop!"],
+                          [fault.title() for fault in context.faults])
+        target_line = "self.notify(\"Loop!\")"
+        line_no = Source.find_target_line_no(target_line)
+        self.assert_equal((self.file_name, line_no),
+                          (context.faults[0].traceback[-1].file_name,
+                           context.faults[0].traceback[-1].line_number))
+
     def test_run_failed_tuple_data(self):
         class TestCase(pikzie.TestCase):
             def test_fail_assertion_tuple_data(self, data):
@@ -235,3 +259,121 @@ class TestRunner(pikzie.TestCase, Assertions):
                             pp.format(data))
         self.assert_output("F", 1, 1, 1, 0, 0, 0, 0, details, [test])
 
+
+    def test_context_counters(self):
+        class TestCase(pikzie.TestCase):
+            def test_notify_and_fail(self):
+                self.notify("first")
+                self.notify("second")
+                self.assert_equal(1, 2)
+
+            def test_success(self):
+                self.assert_true(True)
+
+        context = pikzie.TestRunnerContext()
+        for name in ["test_notify_and_fail", "test_success"]:
+            TestCase(name).run(context)
+        self.assert_equal((2, 1, 0, 2, 3, False),
+                          (context.n_tests, context.n_failures,
+                           context.n_errors, context.n_notifications,
+                           context.n_faults, context.succeeded))
+        faults = context.faults
+        faults.pop()
+        self.assert_equal(3, len(context.faults))
+
+    def test_context_listener_dispatch(self):
+        class TestCase(pikzie.TestCase):
+            def test_assertions(self):
+                self.assert_true(True)
+                self.assert_true(True)
+
+        class Listener(object):
+            def __init__(self):
+                self.events = []
+
+            def on_start_test(self, context, test):
+                self.events.append(("start_test", test.short_name()))
+
+            def on_pass_assertion(self, context, test):
+                self.events.append(("pass_assertion", test.short_name()))
+
+            def on_success(self, context, result):
+                self.events.append(("success", result.test.short_name()))
+
+        listener = Listener()
+        context = pikzie.TestRunnerContext()
+        context.add_listeners([listener, object()])
+        TestCase("test_assertions").run(context)
+        self.assert_equal([("start_test", "test_assertions"),
+                           ("pass_assertion", "test_assertions"),
+                           ("pass_assertion", "test_assertions"),
+                           ("success", "test_assertions")],
+                          listener.events)
+
+    def test_context_assertions_count_at_finish(self):
+        class TestCase(pikzie.TestCase):
+            def test_assertions(self):
+                self.assert_true(True)
+                self.assert_true(True)
+                self.n_assertions_in_test = context.n_assertions
+
+        context = pikzie.TestRunnerContext()
+        test = TestCase("test_assertions")
+        test.run(context)
+        self.assert_equal((0, 2),
+                          (test.n_assertions_in_test, context.n_assertions))
+
+    def test_buffered_output(self):
+        class Output(StringIO):
+            n_writes = 0
+            def write(self, data):
+                self.n_writes += 1
+                return StringIO.write(self, data)
+
+        class TestCase(pikzie.TestCase):
+            def test_1(self):
+                pass
+            def test_2(self):
+                pass
+            def test_3(self):
+                self.assert_true(False)
+
+        tests = [TestCase("test_1"), TestCase("test_2"), TestCase("test_3")]
+        output = Output()
+        runner = ConsoleTestRunner(output, use_color=True,
+                                   flush_interval=60)
+        runner.run(pikzie.TestSuite(tests))
+        success = runner.color_scheme["success"].escape_sequence
+        failure = runner.color_scheme["failure"].escape_sequence
+        reset = runner.reset_color.escape_sequence
+        self.assert_equal((2, "%s.%s%s.%s%sF%s" % (success, reset,
+                                                   success, reset,
+                                                   failure, reset)),
+                          (output.n_writes,
+                           output.getvalue().split("\n")[0]))
+
+    def test_flush_while_running_test(self):
+        output = StringIO()
+        class TestCase(pikzie.TestCase):
+            def test_1(self):
+                pass
+            def test_2(self):
+                time.sleep(0.2)
+                self.output = output.getvalue()
+
+        test = TestCase("test_2")
+        runner = ConsoleTestRunner(output, use_color=False,
+                                   flush_interval=0.05)
+        runner.run(pikzie.TestSuite([TestCase("test_1"), test]))
+        self.assert_equal(".", test.output)
+
+    def test_traceback_entry_lazy_content(self):
+        target_line = "def test_traceback_entry_lazy_content(self):"
+        line_no = Source.find_target_line_no(target_line)
+        entry = pikzie.core.TracebackEntry(self.file_name, line_no,
+                                           "test_traceback_entry_lazy_content")
+        self.assert_equal("%s:%d: %s(): %s" % \
+                              (self.file_name, line_no,
+                               "test_traceback_entry_lazy_content",
+                               target_line),
+                          str(entry))
@@ -1,5 +1,5 @@
 import re
-import cgi
+from xml.sax.saxutils import escape
 
 try:
     from exceptions import *
@@ -33,6 +33,10 @@ class TestXMLReport(pikzie.TestCase, Assertions):
             self.assert_true(False)
         _test_failure = pikzie.bug(1234)(_test_failure)
 
+        TEST_FAILURE_DIFFERENCES_LINE = Source.current_line_no() + 2
+        def _test_failure_differences(self):
+            self.assert_equal({"a": [1, 2]}, {"a": [1, 3]})
+
         TEST_ERROR_LINE = Source.current_line_no() + 3
         def _test_error(self):
             """Should error!!!"""
@@ -99,6 +103,42 @@ class TestXMLReport(pikzie.TestCase, Assertions):
         xml = xml.strip() + "\n"
         self.assert_xml(xml, self._suite(["_test_failure"]), elapsed)
 
+    def test_failure_result_differences(self):
+        elapsed = "0.001"
+        xml = """
+<report>
+  <result>
+    <test_case>
+      <name>test_xml_report.TestCase</name>
+      <description>A test case for test</description>
+    </test_case>
+    <test>
+      <name>_test_failure_differences</name>
+      <description/>
+    </test>
+    <status>failure</status>
+    <detail/>
+    <differences>
+      <difference>['a'][1]: 2 != 3</difference>
+    </differences>
+    <elapsed>%s</elapsed>
+    <backtrace>
+      <entry>
+        <file>%s</file>
+        <line>%s</line>
+        <info>self.assert_equal({"a": [1, 2]}, {"a": [1, 3]})</info>
+      </entry>
+    </backtrace>
+  </result>
+</report>
+"""
+        xml = xml % (elapsed,
+                     Source.current_file(),
+                     self.TestCase.TEST_FAILURE_DIFFERENCES_LINE)
+        xml = xml.strip() + "\n"
+        self.assert_xml(xml, self._suite(["_test_failure_differences"]),
+                        elapsed)
+
     def test_error_result(self):
         elapsed = "0.001"
         xml = """
@@ -127,7 +167,7 @@ class TestXMLReport(pikzie.TestCase, Assertions):
 """
         xml = xml % (("%s: 'TestCase' object has no attribute " +
                       "'non_existence_method'") % \
-                         cgi.escape(str(AttributeError)),
+                         escape(str(AttributeError)),
                      elapsed,
                      Source.current_file(),
                      self.TestCase.TEST_ERROR_LINE)